@@ -39,8 +39,10 @@ from .exceptions import (
     ReServerValidationError,
 )
 from .models import RerankRequest, RerankResponse, RerankResult
+from .retry import RetryBudget
 from .utils import (
     batch_rerank,
+    batch_rerank_async,
     calculate_score_statistics,
     filter_by_score_threshold,
     get_top_k_with_threshold,
@@ -65,7 +67,9 @@ __all__ = [
     "RerankResult",
     "RerankResponse",
     # Utilities
+    "RetryBudget",
     "batch_rerank",
+    "batch_rerank_async",
     "filter_by_score_threshold",
     "get_top_k_with_threshold",
     "calculate_score_statistics",
@@ -0,0 +1,815 @@
+"""
+Client-side load balancing over several ReServer replicas.
+"""
+
+import asyncio
+import itertools
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import grpc
+from grpc import aio
+from grpc_health.v1.health_pb2 import HealthCheckRequest, HealthCheckResponse
+from grpc_health.v1.health_pb2_grpc import HealthStub
+
+from .exceptions import ReServerValidationError
+from .reranker_pb2_grpc import RerankServiceStub
+from .retry import RetryBudget, backoff_delay
+
+POLICIES = ("least_outstanding", "ewma", "round_robin")
+
+# Methods returning a stream of responses instead of a single one
+STREAM_METHODS = frozenset({"RerankStream", "RerankBidiStream"})
+
+# Weight of the newest sample in an endpoint's latency average
+EWMA_ALPHA = 0.3
+
+# Seconds an endpoint that refused a connection is skipped, unless a health
+# check finds it serving again earlier
+EJECT_SECONDS = 10.0
+
+# Read-only unary methods, safe to send to two replicas at once
+HEDGED_METHODS = frozenset({"Rerank", "RerankBatch"})
+
+# Methods using the document index, which every replica keeps for itself:
+# they always go to the home endpoint, see LoadBalancer
+PINNED_METHODS = frozenset({"IndexDocuments", "RerankByIds"})
+
+# Failures after which a unary call is retried: the replica could not be
+# reached
+RETRYABLE_CODES = frozenset({grpc.StatusCode.UNAVAILABLE})
+
+# Failures of replicas shedding load. The call is only retried on a replica
+# that has not been tried yet, so retries do not add load to one that is
+# already saturated
+SHED_CODES = frozenset({grpc.StatusCode.RESOURCE_EXHAUSTED})
+
+# Upper bound of the first retry's jittered delay, doubled per retry
+RETRY_BACKOFF_BASE = 0.05
+RETRY_BACKOFF_MAX = 1.0
+
+# Recent successful calls per method and endpoint kept for percentiles, and
+# how many are needed before hedging relies on them
+LATENCY_WINDOW = 256
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyWindow:
+    """Durations of the most recent successful calls of one method."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: List[float] = []
+        self._size = size
+        self._added = 0
+        self._sorted: Optional[List[float]] = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, duration: float) -> None:
+        if len(self._samples) < self._size:
+            self._samples.append(duration)
+        else:
+            self._samples[self._added % self._size] = duration
+        self._added += 1
+        # Percentiles are re-sorted every 16 samples rather than per call
+        if self._added % 16 == 0:
+            self._sorted = None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile of the window, None with too few samples."""
+        if len(self._samples) < MIN_LATENCY_SAMPLES:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+def resolve_endpoints(host: str, port: int) -> List[str]:
+    """Addresses of every replica behind a DNS name, as `ip:port`."""
+    addresses: List[str] = []
+    for family, _, _, _, sockaddr in socket.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    ):
+        ip = sockaddr[0]
+        address = f"[{ip}]:{port}" if family == socket.AF_INET6 else f"{ip}:{port}"
+        if address not in addresses:
+            addresses.append(address)
+    # Resolvers may rotate the records, keep the home endpoint stable
+    return sorted(addresses)
+
+
+class Endpoint:
+    """One replica: its channels and the load and latency seen by this client."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.outstanding = 0
+        # Moving average of successful call durations, None until the first
+        self.latency: Optional[float] = None
+        self.latencies: Dict[str, LatencyWindow] = {}
+        self.healthy = True
+        self.ejected_until = 0.0
+        self._next_channel = itertools.count()
+        self.channels: List[grpc.Channel] = []
+        self.stubs: List[RerankServiceStub] = []
+        # Async channels only work in the event loop that opened them
+        self.async_channels: Dict[asyncio.AbstractEventLoop, List[aio.Channel]] = {}
+        self.async_stubs: Dict[asyncio.AbstractEventLoop, List[RerankServiceStub]] = {}
+
+    def available(self, now: float) -> bool:
+        return self.healthy and self.ejected_until <= now
+
+    def stub(self) -> RerankServiceStub:
+        stubs = self.stubs
+        return stubs[next(self._next_channel) % len(stubs)]
+
+    def async_stub(self) -> RerankServiceStub:
+        stubs = self.async_stubs[asyncio.get_running_loop()]
+        return stubs[next(self._next_channel) % len(stubs)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "outstanding": self.outstanding,
+            "latency": self.latency,
+            "p95": {
+                method: window.quantile(0.95)
+                for method, window in self.latencies.items()
+            },
+            "healthy": self.healthy,
+            "ejected": self.ejected_until > time.monotonic(),
+        }
+
+
+class LoadBalancer:
+    """
+    Routes each call to one of several replicas.
+
+    `least_outstanding` picks the endpoint with the fewest calls in flight
+    from this client, `ewma` the lowest moving-average latency weighted by
+    the calls in flight (so a fast replica is not flooded), `round_robin`
+    the next one. Ties rotate over the endpoints.
+
+    An endpoint is skipped while the gRPC health service reports it as not
+    serving, or for EJECT_SECONDS after a call failed with UNAVAILABLE. When
+    every endpoint is unavailable, calls are spread over all of them rather
+    than failing outright. Health checks (and DNS re-resolution, when the
+    endpoints come from `resolve`) run on a daemon thread every
+    `health_check_interval` seconds, started with the first call.
+
+    Unary calls failing with one of RETRYABLE_CODES are retried on another
+    endpoint up to `max_retries` times, after a jittered exponential
+    backoff and only while `budget` allows and the call's timeout has not
+    run out. Calls shed by an overloaded endpoint (SHED_CODES) are only
+    retried while there is an endpoint they have not been sent to. With
+    `hedging`, a read-only call that takes longer than the
+    `hedge_quantile` latency of the fastest endpoint (for that method) is
+    sent to an endpoint it has not been sent to yet; the first response
+    wins and the other call is cancelled. Hedges draw from the same budget.
+
+    Indexed documents only exist on the replica that indexed them, so
+    PINNED_METHODS bypass balancing and always go to the home endpoint (the
+    first one), including their retries, and are never hedged.
+    """
+
+    def __init__(
+        self,
+        addresses: List[str],
+        create_channel: Callable[[str], grpc.Channel],
+        create_async_channel: Callable[[str], aio.Channel],
+        channel_pool_size: int = 1,
+        policy: str = "least_outstanding",
+        health_check_interval: float = 5.0,
+        resolve: Optional[Callable[[], List[str]]] = None,
+        max_retries: int = 3,
+        hedging: bool = True,
+        hedge_quantile: float = 0.95,
+        budget: Optional[RetryBudget] = None,
+    ):
+        if policy not in POLICIES:
+            raise ReServerValidationError(
+                f"Unknown load balancing policy {policy!r}, "
+                f"expected one of {', '.join(POLICIES)}"
+            )
+        if not addresses:
+            raise ReServerValidationError("At least one endpoint is required")
+
+        self.policy = policy
+        self.health_check_interval = health_check_interval
+        self.max_retries = max_retries
+        self.hedging = hedging
+        self.hedge_quantile = hedge_quantile
+        self.budget = budget or RetryBudget()
+        self._create_channel = create_channel
+        self._create_async_channel = create_async_channel
+        self._channel_pool_size = channel_pool_size
+        self._resolve = resolve
+        self._lock = threading.Lock()
+        self._next_endpoint = itertools.count()
+        self.endpoints = [Endpoint(address) for address in addresses]
+        # Endpoints dropped by DNS re-resolution, closed with the balancer
+        self._retired: List[Endpoint] = []
+        # Closing async channels of finished event loops
+        self._closing: Set["asyncio.Task[None]"] = set()
+        self._health_thread: Optional[threading.Thread] = None
+        self._stopped: Optional[threading.Event] = None
+
+    def _pick(self, exclude: Optional[Set[Endpoint]] = None) -> Endpoint:
+        now = time.monotonic()
+        endpoints = self.endpoints
+        if exclude:
+            # Retries and hedges go elsewhere, unless there is nowhere else
+            endpoints = [e for e in endpoints if e not in exclude] or endpoints
+        candidates = [e for e in endpoints if e.available(now)] or endpoints
+        start = next(self._next_endpoint)
+        rotated = [
+            candidates[(start + i) % len(candidates)] for i in range(len(candidates))
+        ]
+        if self.policy == "round_robin":
+            return rotated[0]
+        if self.policy == "ewma":
+            return min(rotated, key=lambda e: (e.latency or 0.0) * (e.outstanding + 1))
+        return min(rotated, key=lambda e: e.outstanding)
+
+    def _ensure_health_checks(self) -> None:
+        if self.health_check_interval <= 0:
+            return
+        if len(self.endpoints) < 2 and self._resolve is None:
+            # Nothing to fail over to
+            return
+        if self._health_thread is not None and self._health_thread.is_alive():
+            return
+        with self._lock:
+            if self._health_thread is None or not self._health_thread.is_alive():
+                self._stopped = threading.Event()
+                self._health_thread = threading.Thread(
+                    target=self._health_loop,
+                    args=(self._stopped,),
+                    name="reserver-health",
+                    daemon=True,
+                )
+                self._health_thread.start()
+
+    def _open(self, endpoint: Endpoint) -> None:
+        """Open the endpoint's sync channels on first use."""
+        if not endpoint.stubs:
+            with self._lock:
+                if not endpoint.stubs:
+                    endpoint.channels = [
+                        self._create_channel(endpoint.address)
+                        for _ in range(self._channel_pool_size)
+                    ]
+                    endpoint.stubs = [
+                        RerankServiceStub(channel) for channel in endpoint.channels
+                    ]
+
+    def _open_async(self, endpoint: Endpoint) -> None:
+        """
+        Open the endpoint's async channels in the running event loop.
+
+        Channels of event loops that have been closed since, e.g. by an
+        earlier `asyncio.run()`, are closed here.
+        """
+        loop = asyncio.get_running_loop()
+        if loop in endpoint.async_channels:
+            return
+        with self._lock:
+            if loop in endpoint.async_channels:
+                return
+            stale = self._pop_closed_loops(endpoint)
+            endpoint.async_channels[loop] = [
+                self._create_async_channel(endpoint.address)
+                for _ in range(self._channel_pool_size)
+            ]
+            endpoint.async_stubs[loop] = [
+                RerankServiceStub(channel) for channel in endpoint.async_channels[loop]
+            ]
+        for channel in stale:
+            # Their loop cannot run the close anymore; without a grace period
+            # it completes in one step, on this loop
+            task = loop.create_task(channel.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    def _pop_closed_loops(endpoint: Endpoint) -> List[aio.Channel]:
+        """Forget the endpoint's async channels of closed event loops."""
+        channels = []
+        for loop in [loop for loop in endpoint.async_channels if loop.is_closed()]:
+            channels += endpoint.async_channels.pop(loop)
+            del endpoint.async_stubs[loop]
+        return channels
+
+    def stub(self) -> "_TrackedStub":
+        """Stub bound to the endpoint the next call should go to."""
+        self._ensure_health_checks()
+        return _TrackedStub(self, self._pick(), is_async=False)
+
+    def async_stub(self) -> "_TrackedStub":
+        """Async stub bound to the endpoint the next call should go to."""
+        self._ensure_health_checks()
+        return _TrackedStub(self, self._pick(), is_async=True)
+
+    def hedge_delay(self, endpoint: Endpoint, method: str) -> Optional[float]:
+        """Seconds after which a call should be hedged, None to not hedge."""
+        if not self.hedging or method not in HEDGED_METHODS:
+            return None
+        now = time.monotonic()
+        others = [e for e in self.endpoints if e is not endpoint and e.available(now)]
+        if not others:
+            return None
+        # What a well-behaving replica delivers, not the slow one's own tail
+        quantiles = [
+            window.quantile(self.hedge_quantile)
+            for window in (e.latencies.get(method) for e in self.endpoints)
+            if window is not None
+        ]
+        quantiles = [q for q in quantiles if q is not None]
+        return min(quantiles) if quantiles else None
+
+    def retry_delay(self, attempt: int, remaining: Optional[float]) -> Optional[float]:
+        """Backoff before retry `attempt` (0 for the first), None to give up."""
+        if attempt >= self.max_retries:
+            return None
+        delay = backoff_delay(attempt, RETRY_BACKOFF_BASE, maximum=RETRY_BACKOFF_MAX)
+        if remaining is not None and remaining <= delay:
+            return None
+        if not self.budget.withdraw():
+            return None
+        return delay
+
+    def started(self, endpoint: Endpoint) -> float:
+        with self._lock:
+            endpoint.outstanding += 1
+        return time.monotonic()
+
+    def finished(
+        self,
+        endpoint: Endpoint,
+        start: float,
+        code: Optional[grpc.StatusCode],
+        method: Optional[str] = None,
+    ) -> None:
+        """Record the end of a call, `method` is None for streams."""
+        duration = time.monotonic() - start
+        with self._lock:
+            endpoint.outstanding -= 1
+            # A stream's duration depends on its size, not on the replica
+            if code is None and method is not None:
+                if endpoint.latency is None:
+                    endpoint.latency = duration
+                else:
+                    endpoint.latency += EWMA_ALPHA * (duration - endpoint.latency)
+                window = endpoint.latencies.get(method)
+                if window is None:
+                    window = endpoint.latencies[method] = LatencyWindow()
+                window.add(duration)
+            elif code == grpc.StatusCode.UNAVAILABLE:
+                endpoint.ejected_until = time.monotonic() + EJECT_SECONDS
+
+    def _health_loop(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.health_check_interval):
+            if self._resolve is not None:
+                try:
+                    self._update_endpoints(self._resolve())
+                except OSError:
+                    # Keep the known endpoints while DNS is unavailable
+                    pass
+            for endpoint in list(self.endpoints):
+                self._check(endpoint)
+
+    def _check(self, endpoint: Endpoint) -> None:
+        self._open(endpoint)
+        channels = endpoint.channels
+        if not channels:
+            return
+        try:
+            serving = _serving(channels[0], min(self.health_check_interval, 5.0))
+        except ValueError:
+            # The channel was closed meanwhile
+            return
+        # Servers without the health service are judged by their calls
+        healthy = serving is not False
+        with self._lock:
+            endpoint.healthy = healthy
+            if healthy:
+                endpoint.ejected_until = 0.0
+
+    def serving(self, timeout: float) -> Optional[bool]:
+        """
+        Whether the health service of any endpoint reports SERVING, None if
+        the servers do not implement the health service.
+        """
+        result: Optional[bool] = False
+        for endpoint in list(self.endpoints):
+            self._open(endpoint)
+            serving = _serving(endpoint.channels[0], timeout)
+            if serving:
+                return True
+            if serving is None:
+                result = None
+        return result
+
+    async def serving_async(self, timeout: float) -> Optional[bool]:
+        """Same as `serving()`, over the async channels."""
+        result: Optional[bool] = False
+        for endpoint in list(self.endpoints):
+            self._open_async(endpoint)
+            try:
+                channel = endpoint.async_channels[asyncio.get_running_loop()][0]
+                response = await HealthStub(channel).Check(
+                    HealthCheckRequest(service=""), timeout=timeout
+                )
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    result = None
+                continue
+            if response.status == HealthCheckResponse.SERVING:
+                return True
+        return result
+
+    @property
+    def home(self) -> Endpoint:
+        """Endpoint that holds the document index used by this client."""
+        return self.endpoints[0]
+
+    def _update_endpoints(self, addresses: List[str]) -> None:
+        if not addresses:
+            return
+        with self._lock:
+            home = self.endpoints[0].address
+            if home in addresses:
+                # Keep indexing and by-id calls on the same replica
+                addresses = [home] + [a for a in addresses if a != home]
+            current = {endpoint.address: endpoint for endpoint in self.endpoints}
+            self.endpoints = [
+                current.get(address) or Endpoint(address) for address in addresses
+            ]
+            self._retired += [
+                endpoint
+                for address, endpoint in current.items()
+                if address not in addresses
+            ]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def close(self) -> None:
+        """Stop health checks and close the sync channels."""
+        if self._stopped is not None:
+            self._stopped.set()
+        with self._lock:
+            endpoints, self._retired = self.endpoints + self._retired, []
+            channels = [c for endpoint in endpoints for c in endpoint.channels]
+            for endpoint in endpoints:
+                endpoint.channels, endpoint.stubs = [], []
+        for channel in channels:
+            channel.close()
+
+    async def close_async(self) -> None:
+        """
+        Close the sync channels, and the async ones of the running loop and of
+        closed loops. Channels of other running loops are left to them.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            endpoints = self.endpoints + self._retired
+            channels = []
+            for endpoint in endpoints:
+                channels += self._pop_closed_loops(endpoint)
+                channels += endpoint.async_channels.pop(loop, [])
+                endpoint.async_stubs.pop(loop, None)
+        self.close()
+        for channel in channels:
+            await channel.close()
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+
+def _serving(channel: grpc.Channel, timeout: float) -> Optional[bool]:
+    """Health status of a server, None if it has no health service."""
+    try:
+        response = HealthStub(channel).Check(
+            HealthCheckRequest(service=""), timeout=timeout
+        )
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+            return None
+        return False
+    return response.status == HealthCheckResponse.SERVING
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def _code(future: grpc.Future) -> Optional[grpc.StatusCode]:
+    """Status of a finished call future, None if it succeeded."""
+    if future.cancelled():
+        return grpc.StatusCode.CANCELLED
+    error = future.exception()
+    return None if error is None else error.code()
+
+
+def _first_success(futures: List[grpc.Future]) -> Any:
+    """Result of the first call to succeed, cancelling the others."""
+    finished = threading.Event()
+    for future in futures:
+        future.add_done_callback(lambda _: finished.set())
+    try:
+        while True:
+            finished.wait()
+            finished.clear()
+            done = [future for future in futures if future.done()]
+            for future in done:
+                if _code(future) is None:
+                    return future.result()
+            if len(done) == len(futures):
+                # Every call failed, report the original one
+                return futures[0].result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+class _TrackedStub:
+    """
+    RerankServiceStub proxy bound to the endpoint picked for a call.
+
+    Unary calls are retried and hedged as described in LoadBalancer; every
+    attempt is reported to the balancer.
+    """
+
+    def __init__(self, balancer: LoadBalancer, endpoint: Endpoint, is_async: bool):
+        self._balancer = balancer
+        self._endpoint = endpoint
+        self._is_async = is_async
+
+    def __getattr__(self, name: str) -> Callable:
+        if name in STREAM_METHODS:
+            if self._is_async:
+                return self._stream_async(name)
+            return self._stream(name)
+        if self._is_async:
+            return self._unary_async(name)
+        return self._unary(name)
+
+    def _first(self, name: str) -> Endpoint:
+        if name in PINNED_METHODS:
+            return self._balancer.home
+        return self._endpoint
+
+    def _next(self, name: str, tried: Set[Endpoint]) -> Endpoint:
+        if name in PINNED_METHODS:
+            return self._balancer.home
+        return self._balancer._pick(exclude=tried)
+
+    def _retryable(
+        self, name: str, code: grpc.StatusCode, tried: Set[Endpoint]
+    ) -> bool:
+        if code in RETRYABLE_CODES:
+            return True
+        if code not in SHED_CODES or name in PINNED_METHODS:
+            return False
+        return self._untried(tried)
+
+    def _untried(self, tried: Set[Endpoint]) -> bool:
+        return any(e not in tried for e in self._balancer.endpoints)
+
+    def _method(self, endpoint: Endpoint, name: str) -> Callable:
+        if self._is_async:
+            self._balancer._open_async(endpoint)
+            return getattr(endpoint.async_stub(), name)
+        self._balancer._open(endpoint)
+        return getattr(endpoint.stub(), name)
+
+    def _unary(self, name: str) -> Callable:
+        def call(request, timeout: Optional[float] = None, **kwargs):
+            balancer = self._balancer
+            balancer.budget.deposit()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            endpoint = self._first(name)
+            tried = {endpoint}
+            attempt = 0
+            while True:
+                try:
+                    return self._hedged(
+                        name, endpoint, tried, request, deadline, kwargs
+                    )
+                except grpc.RpcError as e:
+                    delay = None
+                    if self._retryable(name, e.code(), tried):
+                        delay = balancer.retry_delay(attempt, _remaining(deadline))
+                    if delay is None:
+                        raise
+                time.sleep(delay)
+                attempt += 1
+                endpoint = self._next(name, tried)
+                tried.add(endpoint)
+
+        return call
+
+    def _hedged(
+        self,
+        name: str,
+        endpoint: Endpoint,
+        tried: Set[Endpoint],
+        request: Any,
+        deadline: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        balancer = self._balancer
+        delay = balancer.hedge_delay(endpoint, name)
+        if delay is None:
+            return self._attempt(name, endpoint, request, _remaining(deadline), kwargs)
+
+        primary = self._start(name, endpoint, request, _remaining(deadline), kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except grpc.FutureTimeoutError:
+            pass
+        # Never hedge to a replica that was already tried, it may be shedding
+        if not self._untried(tried) or not balancer.budget.withdraw():
+            return primary.result()
+        hedge_endpoint = balancer._pick(exclude=tried)
+        tried.add(hedge_endpoint)
+        hedge = self._start(name, hedge_endpoint, request, _remaining(deadline), kwargs)
+        return _first_success([primary, hedge])
+
+    def _attempt(
+        self,
+        name: str,
+        endpoint: Endpoint,
+        request: Any,
+        timeout: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        method = self._method(endpoint, name)
+        start = self._balancer.started(endpoint)
+        code = None
+        try:
+            return method(request, timeout=timeout, **kwargs)
+        except grpc.RpcError as e:
+            code = e.code()
+            raise
+        except BaseException:
+            code = grpc.StatusCode.UNKNOWN
+            raise
+        finally:
+            self._balancer.finished(endpoint, start, code, name)
+
+    def _start(
+        self,
+        name: str,
+        endpoint: Endpoint,
+        request: Any,
+        timeout: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> grpc.Future:
+        method = self._method(endpoint, name)
+        start = self._balancer.started(endpoint)
+        try:
+            future = method.future(request, timeout=timeout, **kwargs)
+        except BaseException:
+            self._balancer.finished(endpoint, start, grpc.StatusCode.UNKNOWN, name)
+            raise
+        future.add_done_callback(
+            lambda f: self._balancer.finished(endpoint, start, _code(f), name)
+        )
+        return future
+
+    def _unary_async(self, name: str) -> Callable:
+        async def call(request, timeout: Optional[float] = None, **kwargs):
+            balancer = self._balancer
+            balancer.budget.deposit()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            endpoint = self._first(name)
+            tried = {endpoint}
+            attempt = 0
+            while True:
+                try:
+                    return await self._hedged_async(
+                        name, endpoint, tried, request, deadline, kwargs
+                    )
+                except grpc.RpcError as e:
+                    delay = None
+                    if self._retryable(name, e.code(), tried):
+                        delay = balancer.retry_delay(attempt, _remaining(deadline))
+                    if delay is None:
+                        raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                endpoint = self._next(name, tried)
+                tried.add(endpoint)
+
+        return call
+
+    async def _hedged_async(
+        self,
+        name: str,
+        endpoint: Endpoint,
+        tried: Set[Endpoint],
+        request: Any,
+        deadline: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        balancer = self._balancer
+        delay = balancer.hedge_delay(endpoint, name)
+        if delay is None:
+            return await self._attempt_async(
+                name, endpoint, request, _remaining(deadline), kwargs
+            )
+
+        tasks = [
+            asyncio.ensure_future(
+                self._attempt_async(
+                    name, endpoint, request, _remaining(deadline), kwargs
+                )
+            )
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._untried(tried) and balancer.budget.withdraw():
+                hedge_endpoint = balancer._pick(exclude=tried)
+                tried.add(hedge_endpoint)
+                tasks.append(
+                    asyncio.ensure_future(
+                        self._attempt_async(
+                            name, hedge_endpoint, request, _remaining(deadline), kwargs
+                        )
+                    )
+                )
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        return task.result()
+            # Every call failed, report the original one
+            return tasks[0].result()
+        finally:
+            # Cancelling the task cancels its RPC
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt_async(
+        self,
+        name: str,
+        endpoint: Endpoint,
+        request: Any,
+        timeout: Optional[float],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        method = self._method(endpoint, name)
+        start = self._balancer.started(endpoint)
+        code = None
+        try:
+            return await method(request, timeout=timeout, **kwargs)
+        except grpc.RpcError as e:
+            code = e.code()
+            raise
+        except BaseException:
+            # Includes cancellation, which says nothing about the replica
+            code = grpc.StatusCode.UNKNOWN
+            raise
+        finally:
+            self._balancer.finished(endpoint, start, code, name)
+
+    def _stream(self, name: str) -> Callable:
+        def call(*args, **kwargs):
+            method = self._method(self._endpoint, name)
+            start = self._balancer.started(self._endpoint)
+            code = None
+            try:
+                yield from method(*args, **kwargs)
+            except grpc.RpcError as e:
+                code = e.code()
+                raise
+            finally:
+                self._balancer.finished(self._endpoint, start, code)
+
+        return call
+
+    def _stream_async(self, name: str) -> Callable:
+        async def call(*args, **kwargs):
+            method = self._method(self._endpoint, name)
+            start = self._balancer.started(self._endpoint)
+            code = None
+            try:
+                async for response in method(*args, **kwargs):
+                    yield response
+            except grpc.RpcError as e:
+                code = e.code()
+                raise
+            finally:
+                self._balancer.finished(self._endpoint, start, code)
+
+        return call
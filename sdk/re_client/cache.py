@@ -0,0 +1,118 @@
+"""
+Client-side cache of rerank scores.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+
+# Expiry time and the scores of a query's documents, by document digest
+_Entry = Tuple[float, Dict[bytes, float]]
+
+
+def _digest(text: str) -> bytes:
+    return blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ResultCache:
+    """
+    Thread-safe TTL + LRU cache of document scores per (model, query).
+
+    Scores are stored per document rather than per request, so a request is
+    served from the cache whenever every one of its documents has been
+    scored for the same query before, e.g. a repeated request or a page of a
+    previously reranked candidate set. Entries expire `ttl` seconds after the
+    query was last scored by the server, and the least recently used queries
+    are evicted once more than `max_scores` document scores are cached.
+
+    A single lock guards the cache; it is only held for dictionary
+    operations, so it is also safe to use from asyncio tasks.
+    """
+
+    def __init__(self, max_scores: int, ttl: float = 60.0):
+        self.max_scores = max_scores
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, bytes], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, model: Optional[str]) -> Tuple[str, bytes]:
+        return model or "", _digest(query)
+
+    @staticmethod
+    def document_keys(documents: List[str]) -> List[bytes]:
+        return [_digest(document) for document in documents]
+
+    def get(
+        self, key: Tuple[str, bytes], document_keys: List[bytes]
+    ) -> Optional[List[float]]:
+        """Cached scores of the documents, None unless all of them are cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            scores = entry[1]
+            try:
+                found = [scores[document_key] for document_key in document_keys]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return found
+
+    def put(self, key: Tuple[str, bytes], scores: Dict[bytes, float]) -> None:
+        """Add document scores of a query, refreshing its expiry."""
+        if len(scores) > self.max_scores:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                merged = entry[1]
+                self.size -= len(merged)
+                merged.update(scores)
+            else:
+                if entry is not None:
+                    self._remove(key)
+                merged = dict(scores)
+            self._entries[key] = (time.monotonic() + self.ttl, merged)
+            self._entries.move_to_end(key)
+            self.size += len(merged)
+
+            while self.size > self.max_scores and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, bytes]) -> None:
+        _, scores = self._entries.pop(key)
+        self.size -= len(scores)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "queries": len(self._entries),
+                "scores": self.size,
+            }
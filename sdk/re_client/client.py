@@ -2,7 +2,19 @@
 Main client class for ReServer Reranker Server.
 """
 
-from typing import List, Optional
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import grpc
 from grpc import aio
@@ -14,9 +26,16 @@ from .exceptions import (
     ReServerTimeoutError,
     ReServerValidationError,
 )
+from .balancer import LoadBalancer, _TrackedStub, resolve_endpoints
+from .cache import ResultCache
 from .models import RerankResponse, RerankResult
+from .retry import RetryBudget
+from .reranker_pb2 import IndexDocumentsRequest as ProtoIndexDocumentsRequest
+from .reranker_pb2 import IndexedDocument as ProtoIndexedDocument
+from .reranker_pb2 import RerankBatchRequest as ProtoRerankBatchRequest
+from .reranker_pb2 import RerankByIdsRequest as ProtoRerankByIdsRequest
 from .reranker_pb2 import RerankRequest as ProtoRerankRequest
-from .reranker_pb2_grpc import RerankServiceStub
+from .reranker_pb2 import RerankStreamRequest as ProtoRerankStreamRequest
 
 
 class ReServerClient:
@@ -34,81 +53,329 @@ class ReServerClient:
         max_retries: int = 3,
         secure: bool = False,
         credentials: Optional[grpc.ChannelCredentials] = None,
+        channel_pool_size: int = 1,
+        keepalive_time: float = 30.0,
+        cache_size: int = 0,
+        cache_ttl: float = 60.0,
+        endpoints: Optional[List[str]] = None,
+        load_balancing: str = "least_outstanding",
+        resolve_dns: bool = False,
+        health_check_interval: float = 5.0,
+        hedging: bool = True,
+        hedge_quantile: float = 0.95,
+        retry_budget: float = 0.1,
     ):
         """
         Initialize ReServer client.
 
+        Channels are opened on first use and reused by every call, from any
+        thread, until `close()`. Prefer one long-lived client per server over
+        a client per request.
+
         Args:
             host: Server hostname
             port: Server port
             timeout: Request timeout in seconds
-            max_retries: Maximum number of retry attempts
+            max_retries: Retries of a call that could not reach a replica or
+                was shed by an overloaded one, each on another replica
             secure: Whether to use secure connection
             credentials: gRPC credentials for secure connections
+            channel_pool_size: Channels (each with its own connection) that
+                calls are spread over round-robin
+            keepalive_time: Seconds between keepalive pings on idle
+                connections (0 disables them)
+            cache_size: Maximum number of document scores cached by
+                `rerank()` and `rerank_async()` (0 disables the cache)
+            cache_ttl: Seconds a query's cached scores stay valid
+            endpoints: `host:port` addresses of several replicas to spread
+                calls over (`host` and `port` are ignored when given); index
+                and by-id calls always go to the first one
+            load_balancing: How a call's replica is chosen:
+                `least_outstanding`, `ewma` (latency) or `round_robin`
+            resolve_dns: Use every address `host` resolves to as a replica,
+                re-resolving it on each health check
+            health_check_interval: Seconds between gRPC health checks of the
+                replicas (0 disables them)
+            hedging: With several replicas, send read-only calls that take
+                longer than usual to a second replica as well
+            hedge_quantile: Latency quantile of the fastest replica after
+                which a call is hedged
+            retry_budget: Retries plus hedges allowed as a fraction of calls
         """
+        if channel_pool_size < 1:
+            raise ReServerValidationError("channel_pool_size must be at least 1")
+
         self.host = host
         self.port = port
         self.timeout = timeout
         self.max_retries = max_retries
         self.secure = secure
         self.credentials = credentials
-        self._address = f"{host}:{port}"
+        self.channel_pool_size = channel_pool_size
+        self.keepalive_time = keepalive_time
+        self.resolve_dns = resolve_dns
+        self._cache = ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+
+        resolve = None
+        if endpoints:
+            addresses = list(endpoints)
+        elif resolve_dns:
+            resolve = partial(resolve_endpoints, host, port)
+            try:
+                addresses = resolve()
+            except OSError as e:
+                raise ReServerConnectionError(f"Cannot resolve {host}: {e}")
+        else:
+            addresses = [f"{host}:{port}"]
+        self.endpoints = addresses
+        self._address = ", ".join(addresses)
+
+        self._balancer = LoadBalancer(
+            addresses,
+            self._create_channel,
+            self._create_async_channel,
+            channel_pool_size=channel_pool_size,
+            policy=load_balancing,
+            health_check_interval=health_check_interval,
+            resolve=resolve,
+            max_retries=max_retries,
+            hedging=hedging,
+            hedge_quantile=hedge_quantile,
+            budget=RetryBudget(retry_budget),
+        )
 
-    def _create_channel(self) -> grpc.Channel:
-        """Create a gRPC channel."""
+    def __enter__(self) -> "ReServerClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "ReServerClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close_async()
+
+    def _channel_options(self) -> List[Tuple[str, Union[int, str]]]:
+        """Channel arguments shared by sync and async channels."""
+        # A local subchannel pool gives every channel its own connection
+        # instead of sharing one with other channels to the same address
+        options: List[Tuple[str, Union[int, str]]] = [
+            ("grpc.use_local_subchannel_pool", 1)
+        ]
+        if self.secure and self.resolve_dns:
+            # Replicas are dialed by IP, verify the certificate of the name
+            options.append(("grpc.ssl_target_name_override", self.host))
+        if self.keepalive_time > 0:
+            options += [
+                ("grpc.keepalive_time_ms", int(self.keepalive_time * 1000)),
+                ("grpc.keepalive_timeout_ms", 10000),
+                ("grpc.keepalive_permit_without_calls", 1),
+                ("grpc.http2.max_pings_without_data", 0),
+            ]
+        return options
+
+    def _create_channel(self, address: str) -> grpc.Channel:
+        """Create a gRPC channel to one replica."""
+        options = self._channel_options()
         if self.secure:
             if self.credentials:
-                return grpc.secure_channel(self._address, self.credentials)
+                return grpc.secure_channel(address, self.credentials, options=options)
             else:
                 return grpc.secure_channel(
-                    self._address, grpc.ssl_channel_credentials()
+                    address, grpc.ssl_channel_credentials(), options=options
                 )
         else:
-            return grpc.insecure_channel(self._address)
+            return grpc.insecure_channel(address, options=options)
 
-    def _create_async_channel(self) -> aio.Channel:
-        """Create an async gRPC channel."""
+    def _create_async_channel(self, address: str) -> aio.Channel:
+        """Create an async gRPC channel to one replica."""
+        options = self._channel_options()
         if self.secure:
             if self.credentials:
-                return aio.secure_channel(self._address, self.credentials)
+                return aio.secure_channel(address, self.credentials, options=options)
             else:
-                return aio.secure_channel(self._address, grpc.ssl_channel_credentials())
+                return aio.secure_channel(
+                    address, grpc.ssl_channel_credentials(), options=options
+                )
         else:
-            return aio.insecure_channel(self._address)
+            return aio.insecure_channel(address, options=options)
+
+    def _stub(self) -> _TrackedStub:
+        """Stub of the replica the next call goes to, opening its channels."""
+        return self._balancer.stub()
+
+    def _async_stub(self) -> _TrackedStub:
+        """Stub of the next replica's channels of the running event loop."""
+        return self._balancer.async_stub()
+
+    def endpoint_stats(self) -> List[Dict[str, Any]]:
+        """
+        Per replica: calls in flight, average latency in seconds and whether
+        it is healthy or ejected after a connection failure.
+        """
+        return self._balancer.stats()
+
+    def close(self) -> None:
+        """
+        Close the pooled channels. Calls made afterwards reopen them.
+
+        Async channels can only be closed from their event loop, use
+        `close_async()` (or `async with`) for clients used asynchronously.
+        """
+        self._balancer.close()
+
+    async def close_async(self) -> None:
+        """Close the pooled sync and async channels."""
+        await self._balancer.close_async()
 
     def _validate_request(self, query: str, documents: List[str]) -> None:
         """Validate rerank request parameters."""
+        if len(documents) > 1000:  # Reasonable limit
+            raise ReServerValidationError("Too many documents (max 1000)")
+
+        self._validate_stream_request(query, documents)
+
+    def _validate_stream_request(self, query: str, documents: List[str]) -> None:
+        """
+        Validate streaming rerank parameters. Streams are scored chunk by
+        chunk, so the document count is not capped.
+        """
         if not query or not query.strip():
             raise ReServerValidationError("Query cannot be empty")
 
         if not documents:
             raise ReServerValidationError("Documents list cannot be empty")
 
-        if len(documents) > 1000:  # Reasonable limit
-            raise ReServerValidationError("Too many documents (max 1000)")
-
         for i, doc in enumerate(documents):
             if not doc or not doc.strip():
                 raise ReServerValidationError(f"Document at index {i} cannot be empty")
 
-    def _convert_response(self, proto_response) -> RerankResponse:
-        """Convert protobuf response to SDK response."""
-        results = []
-        for proto_result in proto_response.results:
-            result = RerankResult(
-                original_index=proto_result.original_index,
-                score=proto_result.score,
-                text=proto_result.text,
+    def _validate_batch(self, queries: List[str], documents: List[str]) -> None:
+        """Validate multi-query rerank request parameters."""
+        if not queries:
+            raise ReServerValidationError("Queries list cannot be empty")
+
+        for i, query in enumerate(queries):
+            if not query or not query.strip():
+                raise ReServerValidationError(f"Query at index {i} cannot be empty")
+
+        self._validate_request(queries[0], documents)
+
+    def _validate_ids(self, document_ids: List[str]) -> None:
+        """Validate document ids of indexed documents."""
+        if not document_ids:
+            raise ReServerValidationError("Document ids list cannot be empty")
+
+        for i, doc_id in enumerate(document_ids):
+            if not doc_id:
+                raise ReServerValidationError(
+                    f"Document id at index {i} cannot be empty"
+                )
+
+    def _selection_options(
+        self, top_k: Optional[int], min_score: Optional[float]
+    ) -> Dict[str, Union[int, float]]:
+        """Build the optional server-side selection fields of a request."""
+        options: Dict[str, Union[int, float]] = {}
+        if top_k is not None:
+            if top_k < 1:
+                raise ReServerValidationError("top_k must be at least 1")
+            options["top_k"] = top_k
+        if min_score is not None:
+            options["min_score"] = min_score
+        return options
+
+    def _translate_error(
+        self, e: grpc.RpcError, request_timeout: float
+    ) -> ReServerClientError:
+        """Map a gRPC error to the matching SDK exception."""
+        if e.code() == grpc.StatusCode.UNAVAILABLE:
+            return ReServerConnectionError(
+                f"Cannot connect to server at {self._address}"
             )
-            results.append(result)
+        elif e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+            return ReServerTimeoutError(f"Request timed out after {request_timeout}s")
+        else:
+            return ReServerServerError(f"Server error: {e.details()}", str(e.code()))
+
+    def _convert_response(self, proto_response) -> RerankResponse:
+        """Wrap a protobuf response; results are converted on access."""
+        return RerankResponse.from_proto(proto_response.results)
+
+    def _cached_response(
+        self,
+        scores: List[float],
+        documents: List[str],
+        top_k: Optional[int],
+        min_score: Optional[float],
+        return_text: bool,
+    ) -> RerankResponse:
+        """Build a response from cached scores, selecting like the server."""
+        selected = [
+            i
+            for i, score in enumerate(scores)
+            if min_score is None or score >= min_score
+        ]
+        # Stable sort: ties keep the document order
+        selected.sort(key=lambda i: -scores[i])
+        if top_k is not None:
+            selected = selected[:top_k]
+        return RerankResponse(
+            results=[
+                RerankResult(
+                    original_index=i,
+                    score=scores[i],
+                    text=documents[i] if return_text else "",
+                )
+                for i in selected
+            ]
+        )
+
+    def _cache_response(
+        self, cache_key, document_keys: List[bytes], proto_response
+    ) -> List[float]:
+        """Remember the scores of an untrimmed server response, by document."""
+        assert self._cache is not None
+        scores = [0.0] * len(document_keys)
+        for result in proto_response.results:
+            scores[result.original_index] = result.score
+        self._cache.put(cache_key, dict(zip(document_keys, scores)))
+        return scores
 
-        return RerankResponse(results=results)
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Hit/miss counts, hit rate, evictions and size of the result cache,
+        None if it is disabled.
+        """
+        if self._cache is None:
+            return None
+        return self._cache.stats()
+
+    def clear_cache(self) -> None:
+        """Drop every cached score."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _convert_score_matrix(
+        self, proto_response, num_documents: int
+    ) -> List[List[float]]:
+        """Split the row-major score matrix of a batch response into rows."""
+        scores = list(proto_response.scores)
+        return [
+            scores[start : start + num_documents]
+            for start in range(0, len(scores), num_documents)
+        ]
 
     def rerank(
         self,
         query: str,
         documents: List[str],
         timeout: Optional[float] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        return_text: bool = True,
+        model: Optional[str] = None,
     ) -> RerankResponse:
         """
         Rerank documents based on query relevance (synchronous).
@@ -117,6 +384,11 @@ class ReServerClient:
             query: Search query
             documents: List of documents to rerank
             timeout: Request timeout (overrides default)
+            top_k: Only return the k best results (selected server-side, or
+                client-side when the result cache is enabled)
+            min_score: Drop results scoring below this threshold
+            return_text: Echo document text back in the results
+            model: Model variant to score with (server default if None)
 
         Returns:
             RerankResponse with ranked results
@@ -128,18 +400,42 @@ class ReServerClient:
             ReServerTimeoutError: Request timeout
         """
         self._validate_request(query, documents)
+        options = self._selection_options(top_k, min_score)
+
+        request_text = return_text
+        if self._cache is not None:
+            cache_key = ResultCache.key(query, model)
+            document_keys = ResultCache.document_keys(documents)
+            scores = self._cache.get(cache_key, document_keys)
+            if scores is not None:
+                return self._cached_response(
+                    scores, documents, top_k, min_score, return_text
+                )
+            # Fetch every score, untrimmed, so the cache can also answer later
+            # calls with another top_k or min_score
+            options, request_text = {}, False
 
         request_timeout = timeout or self.timeout
 
         try:
-            with self._create_channel() as channel:
-                stub = RerankServiceStub(channel)
+            stub = self._stub()
 
-                proto_request = ProtoRerankRequest(query=query, documents=documents)
+            proto_request = ProtoRerankRequest(
+                query=query,
+                documents=documents,
+                return_text=request_text,
+                model=model,
+                **options,
+            )
 
-                proto_response = stub.Rerank(proto_request, timeout=request_timeout)
+            proto_response = stub.Rerank(proto_request, timeout=request_timeout)
+            if self._cache is not None:
+                scores = self._cache_response(cache_key, document_keys, proto_response)
+                return self._cached_response(
+                    scores, documents, top_k, min_score, return_text
+                )
 
-                return self._convert_response(proto_response)
+            return self._convert_response(proto_response)
 
         except grpc.RpcError as e:
             if e.code() == grpc.StatusCode.UNAVAILABLE:
@@ -160,6 +456,10 @@ class ReServerClient:
         query: str,
         documents: List[str],
         timeout: Optional[float] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        return_text: bool = True,
+        model: Optional[str] = None,
     ) -> RerankResponse:
         """
         Rerank documents based on query relevance (asynchronous).
@@ -168,6 +468,11 @@ class ReServerClient:
             query: Search query
             documents: List of documents to rerank
             timeout: Request timeout (overrides default)
+            top_k: Only return the k best results (selected server-side, or
+                client-side when the result cache is enabled)
+            min_score: Drop results scoring below this threshold
+            return_text: Echo document text back in the results
+            model: Model variant to score with (server default if None)
 
         Returns:
             RerankResponse with ranked results
@@ -179,20 +484,42 @@ class ReServerClient:
             ReServerTimeoutError: Request timeout
         """
         self._validate_request(query, documents)
+        options = self._selection_options(top_k, min_score)
+
+        request_text = return_text
+        if self._cache is not None:
+            cache_key = ResultCache.key(query, model)
+            document_keys = ResultCache.document_keys(documents)
+            scores = self._cache.get(cache_key, document_keys)
+            if scores is not None:
+                return self._cached_response(
+                    scores, documents, top_k, min_score, return_text
+                )
+            # Fetch every score, untrimmed, so the cache can also answer later
+            # calls with another top_k or min_score
+            options, request_text = {}, False
 
         request_timeout = timeout or self.timeout
 
         try:
-            async with self._create_async_channel() as channel:
-                stub = RerankServiceStub(channel)
+            stub = self._async_stub()
 
-                proto_request = ProtoRerankRequest(query=query, documents=documents)
+            proto_request = ProtoRerankRequest(
+                query=query,
+                documents=documents,
+                return_text=request_text,
+                model=model,
+                **options,
+            )
 
-                proto_response = await stub.Rerank(
-                    proto_request, timeout=request_timeout
+            proto_response = await stub.Rerank(proto_request, timeout=request_timeout)
+            if self._cache is not None:
+                scores = self._cache_response(cache_key, document_keys, proto_response)
+                return self._cached_response(
+                    scores, documents, top_k, min_score, return_text
                 )
 
-                return self._convert_response(proto_response)
+            return self._convert_response(proto_response)
 
         except grpc.RpcError as e:
             if e.code() == grpc.StatusCode.UNAVAILABLE:
@@ -206,19 +533,639 @@ class ReServerClient:
         except Exception as e:
             raise ReServerClientError(f"Unexpected error: {str(e)}")
 
+    def rerank_batch(
+        self,
+        queries: List[str],
+        documents: List[str],
+        timeout: Optional[float] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        return_text: bool = True,
+        model: Optional[str] = None,
+    ) -> List[RerankResponse]:
+        """
+        Rerank the same documents for several queries (synchronous).
+
+        The server encodes the documents once for all queries, which is much
+        cheaper than one `rerank()` call per query.
+
+        Args:
+            queries: Search queries, e.g. rewrites or sub-questions
+            documents: List of documents shared by all queries
+            timeout: Request timeout (overrides default)
+            top_k: Only return the k best results of each query
+            min_score: Drop results scoring below this threshold
+            return_text: Echo document text back in the results
+            model: Model variant to score with (server default if None)
+
+        Returns:
+            One RerankResponse per query, in the order of `queries`
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error
+            ReServerTimeoutError: Request timeout
+        """
+        self._validate_batch(queries, documents)
+        options = self._selection_options(top_k, min_score)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._stub()
+
+            proto_request = ProtoRerankBatchRequest(
+                queries=queries,
+                documents=documents,
+                return_text=return_text,
+                model=model,
+                **options,
+            )
+
+            proto_response = stub.RerankBatch(proto_request, timeout=request_timeout)
+
+            return [
+                self._convert_response(response)
+                for response in proto_response.responses
+            ]
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    async def rerank_batch_async(
+        self,
+        queries: List[str],
+        documents: List[str],
+        timeout: Optional[float] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        return_text: bool = True,
+        model: Optional[str] = None,
+    ) -> List[RerankResponse]:
+        """
+        Rerank the same documents for several queries (asynchronous).
+
+        Same parameters and results as `rerank_batch()`.
+        """
+        self._validate_batch(queries, documents)
+        options = self._selection_options(top_k, min_score)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._async_stub()
+
+            proto_request = ProtoRerankBatchRequest(
+                queries=queries,
+                documents=documents,
+                return_text=return_text,
+                model=model,
+                **options,
+            )
+
+            proto_response = await stub.RerankBatch(
+                proto_request, timeout=request_timeout
+            )
+
+            return [
+                self._convert_response(response)
+                for response in proto_response.responses
+            ]
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    def score_batch(
+        self,
+        queries: List[str],
+        documents: List[str],
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> List[List[float]]:
+        """
+        Score every query against every document (synchronous).
+
+        Args:
+            queries: Search queries
+            documents: List of documents shared by all queries
+            timeout: Request timeout (overrides default)
+            model: Model variant to score with (server default if None)
+
+        Returns:
+            Score matrix, `scores[i][j]` is the score of `documents[j]` for
+            `queries[i]`
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error
+            ReServerTimeoutError: Request timeout
+        """
+        self._validate_batch(queries, documents)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._stub()
+
+            proto_request = ProtoRerankBatchRequest(
+                queries=queries,
+                documents=documents,
+                model=model,
+                score_matrix=True,
+            )
+
+            proto_response = stub.RerankBatch(proto_request, timeout=request_timeout)
+
+            return self._convert_score_matrix(proto_response, len(documents))
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    async def score_batch_async(
+        self,
+        queries: List[str],
+        documents: List[str],
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> List[List[float]]:
+        """
+        Score every query against every document (asynchronous).
+
+        Same parameters and results as `score_batch()`.
+        """
+        self._validate_batch(queries, documents)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._async_stub()
+
+            proto_request = ProtoRerankBatchRequest(
+                queries=queries,
+                documents=documents,
+                model=model,
+                score_matrix=True,
+            )
+
+            proto_response = await stub.RerankBatch(
+                proto_request, timeout=request_timeout
+            )
+
+            return self._convert_score_matrix(proto_response, len(documents))
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    def index_documents(
+        self,
+        documents: Dict[str, str],
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Register documents on the server so they can be reranked by id.
+
+        Args:
+            documents: Mapping of document id to document text
+            timeout: Request timeout (overrides default)
+
+        Returns:
+            Number of documents indexed
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error (e.g. index disabled)
+            ReServerTimeoutError: Request timeout
+        """
+        self._validate_ids(list(documents))
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._stub()
+
+            proto_request = ProtoIndexDocumentsRequest(
+                documents=[
+                    ProtoIndexedDocument(id=doc_id, text=text)
+                    for doc_id, text in documents.items()
+                ]
+            )
+
+            proto_response = stub.IndexDocuments(proto_request, timeout=request_timeout)
+
+            return proto_response.indexed
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    async def index_documents_async(
+        self,
+        documents: Dict[str, str],
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Register documents on the server so they can be reranked by id
+        (asynchronous).
+
+        Args:
+            documents: Mapping of document id to document text
+            timeout: Request timeout (overrides default)
+
+        Returns:
+            Number of documents indexed
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error (e.g. index disabled)
+            ReServerTimeoutError: Request timeout
+        """
+        self._validate_ids(list(documents))
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._async_stub()
+
+            proto_request = ProtoIndexDocumentsRequest(
+                documents=[
+                    ProtoIndexedDocument(id=doc_id, text=text)
+                    for doc_id, text in documents.items()
+                ]
+            )
+
+            proto_response = await stub.IndexDocuments(
+                proto_request, timeout=request_timeout
+            )
+
+            return proto_response.indexed
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    def rerank_by_ids(
+        self,
+        query: str,
+        document_ids: List[str],
+        timeout: Optional[float] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> RerankResponse:
+        """
+        Rerank previously indexed documents by id (synchronous).
+
+        Results carry the position in `document_ids` as `original_index` and
+        an empty `text`.
+
+        Args:
+            query: Search query
+            document_ids: Ids of indexed documents to rerank
+            timeout: Request timeout (overrides default)
+            top_k: Only return the k best results (selected server-side)
+            min_score: Drop results scoring below this threshold
+
+        Returns:
+            RerankResponse with ranked results
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error (e.g. unknown document ids)
+            ReServerTimeoutError: Request timeout
+        """
+        if not query or not query.strip():
+            raise ReServerValidationError("Query cannot be empty")
+        self._validate_ids(document_ids)
+        options = self._selection_options(top_k, min_score)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._stub()
+
+            proto_request = ProtoRerankByIdsRequest(
+                query=query, document_ids=document_ids, **options
+            )
+
+            proto_response = stub.RerankByIds(proto_request, timeout=request_timeout)
+
+            return self._convert_response(proto_response)
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    async def rerank_by_ids_async(
+        self,
+        query: str,
+        document_ids: List[str],
+        timeout: Optional[float] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> RerankResponse:
+        """
+        Rerank previously indexed documents by id (asynchronous).
+
+        Args:
+            query: Search query
+            document_ids: Ids of indexed documents to rerank
+            timeout: Request timeout (overrides default)
+            top_k: Only return the k best results (selected server-side)
+            min_score: Drop results scoring below this threshold
+
+        Returns:
+            RerankResponse with ranked results
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error (e.g. unknown document ids)
+            ReServerTimeoutError: Request timeout
+        """
+        if not query or not query.strip():
+            raise ReServerValidationError("Query cannot be empty")
+        self._validate_ids(document_ids)
+        options = self._selection_options(top_k, min_score)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._async_stub()
+
+            proto_request = ProtoRerankByIdsRequest(
+                query=query, document_ids=document_ids, **options
+            )
+
+            proto_response = await stub.RerankByIds(
+                proto_request, timeout=request_timeout
+            )
+
+            return self._convert_response(proto_response)
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    def rerank_stream(
+        self,
+        query: str,
+        documents: List[str],
+        chunk_size: int = 0,
+        top_k: int = 0,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> Iterator[RerankResponse]:
+        """
+        Rerank documents chunk by chunk, yielding results as the server scores
+        them (synchronous).
+
+        Without `top_k`, yields one response per chunk whose results are
+        sorted within the chunk and whose `original_index` refers to
+        `documents`. With `top_k`, yields a single response with the merged
+        top k results.
+
+        Args:
+            query: Search query
+            documents: List of documents to rerank
+            chunk_size: Documents scored per chunk (0 uses the server default)
+            top_k: Only return the k best results once all chunks are scored
+            timeout: Timeout for the whole stream (overrides default)
+            model: Model variant to score with (server default if None)
+
+        Yields:
+            RerankResponse with partial or final results
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error
+            ReServerTimeoutError: Request timeout
+        """
+        self._validate_stream_request(query, documents)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._stub()
+
+            proto_request = ProtoRerankStreamRequest(
+                query=query,
+                documents=documents,
+                chunk_size=chunk_size,
+                top_k=top_k,
+                model=model,
+            )
+
+            for proto_response in stub.RerankStream(
+                proto_request, timeout=request_timeout
+            ):
+                if proto_response.results:
+                    yield self._convert_response(proto_response)
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    async def rerank_stream_async(
+        self,
+        query: str,
+        documents: List[str],
+        chunk_size: int = 0,
+        top_k: int = 0,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[RerankResponse]:
+        """
+        Rerank documents chunk by chunk, yielding results as the server scores
+        them (asynchronous).
+
+        Same parameters and results as `rerank_stream()`.
+        """
+        self._validate_stream_request(query, documents)
+
+        request_timeout = timeout or self.timeout
+
+        try:
+            stub = self._async_stub()
+
+            proto_request = ProtoRerankStreamRequest(
+                query=query,
+                documents=documents,
+                chunk_size=chunk_size,
+                top_k=top_k,
+                model=model,
+            )
+
+            async for proto_response in stub.RerankStream(
+                proto_request, timeout=request_timeout
+            ):
+                if proto_response.results:
+                    yield self._convert_response(proto_response)
+
+        except grpc.RpcError as e:
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    def rerank_pipelined(
+        self,
+        query: str,
+        document_batches: Iterable[List[str]],
+        chunk_size: int = 0,
+        top_k: int = 0,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> Iterator[RerankResponse]:
+        """
+        Rerank documents while they are still being produced, e.g. by an
+        upstream retriever (synchronous).
+
+        Batches are sent as soon as the iterable yields them and the server
+        scores them in `chunk_size` pieces. `original_index` refers to the
+        position across all batches.
+
+        Args:
+            query: Search query
+            document_batches: Iterable of document lists
+            chunk_size: Documents scored per chunk (0 uses the server default)
+            top_k: Only return the k best results once all batches are scored
+            timeout: Timeout for the whole stream (overrides default)
+            model: Model variant to score with (server default if None)
+
+        Yields:
+            RerankResponse with partial or final results
+
+        Raises:
+            ReServerValidationError: Invalid input parameters
+            ReServerConnectionError: Connection failed
+            ReServerServerError: Server error
+            ReServerTimeoutError: Request timeout
+        """
+        if not query or not query.strip():
+            raise ReServerValidationError("Query cannot be empty")
+
+        request_timeout = timeout or self.timeout
+        validation_errors: List[ReServerValidationError] = []
+
+        def requests() -> Iterator[ProtoRerankStreamRequest]:
+            yield ProtoRerankStreamRequest(
+                query=query, chunk_size=chunk_size, top_k=top_k, model=model
+            )
+            for batch in document_batches:
+                try:
+                    self._validate_stream_request(query, batch)
+                except ReServerValidationError as e:
+                    # gRPC only reports a cancelled stream, keep the real cause
+                    validation_errors.append(e)
+                    raise
+                yield ProtoRerankStreamRequest(documents=batch)
+
+        try:
+            stub = self._stub()
+
+            for proto_response in stub.RerankBidiStream(
+                requests(), timeout=request_timeout
+            ):
+                if proto_response.results:
+                    yield self._convert_response(proto_response)
+
+        except grpc.RpcError as e:
+            if validation_errors:
+                raise validation_errors[0]
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
+    async def rerank_pipelined_async(
+        self,
+        query: str,
+        document_batches: AsyncIterable[List[str]],
+        chunk_size: int = 0,
+        top_k: int = 0,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[RerankResponse]:
+        """
+        Rerank documents while they are still being produced (asynchronous).
+
+        Same parameters and results as `rerank_pipelined()`, but
+        `document_batches` is an async iterable.
+        """
+        if not query or not query.strip():
+            raise ReServerValidationError("Query cannot be empty")
+
+        request_timeout = timeout or self.timeout
+        validation_errors: List[ReServerValidationError] = []
+
+        async def requests() -> AsyncIterator[ProtoRerankStreamRequest]:
+            yield ProtoRerankStreamRequest(
+                query=query, chunk_size=chunk_size, top_k=top_k, model=model
+            )
+            async for batch in document_batches:
+                try:
+                    self._validate_stream_request(query, batch)
+                except ReServerValidationError as e:
+                    # gRPC only reports a cancelled stream, keep the real cause
+                    validation_errors.append(e)
+                    raise
+                yield ProtoRerankStreamRequest(documents=batch)
+
+        try:
+            stub = self._async_stub()
+
+            async for proto_response in stub.RerankBidiStream(
+                requests(), timeout=request_timeout
+            ):
+                if proto_response.results:
+                    yield self._convert_response(proto_response)
+
+        except grpc.RpcError as e:
+            if validation_errors:
+                raise validation_errors[0]
+            raise self._translate_error(e, request_timeout)
+        except Exception as e:
+            raise ReServerClientError(f"Unexpected error: {str(e)}")
+
     def health_check(self, timeout: Optional[float] = None) -> bool:
         """
         Check if server is healthy.
 
+        Asks the gRPC health service of the server (any replica serving
+        counts), bypassing the result cache.
+
         Args:
             timeout: Request timeout
 
         Returns:
             True if server is healthy, False otherwise
         """
+        request_timeout = timeout or 5.0
         try:
-            # Simple health check by sending a minimal request
-            self.rerank("test", ["test document"], timeout=timeout or 5.0)
+            serving = self._balancer.serving(request_timeout)
+            if serving is not None:
+                return serving
+            # No health service: send a minimal request straight to the stub
+            self._stub().Rerank(
+                ProtoRerankRequest(query="test", documents=["test document"]),
+                timeout=request_timeout,
+            )
             return True
         except Exception:
             return False
@@ -233,9 +1180,16 @@ class ReServerClient:
         Returns:
             True if server is healthy, False otherwise
         """
+        request_timeout = timeout or 5.0
         try:
-            # Simple health check by sending a minimal request
-            await self.rerank_async("test", ["test document"], timeout=timeout or 5.0)
+            serving = await self._balancer.serving_async(request_timeout)
+            if serving is not None:
+                return serving
+            # No health service: send a minimal request straight to the stub
+            await self._async_stub().Rerank(
+                ProtoRerankRequest(query="test", documents=["test document"]),
+                timeout=request_timeout,
+            )
             return True
         except Exception:
             return False
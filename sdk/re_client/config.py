@@ -4,6 +4,7 @@ Configuration management for ReServer Client SDK.
 
 import os
 from dataclasses import dataclass
+from typing import List, Optional
 
 
 @dataclass
@@ -15,6 +16,17 @@ class ClientConfig:
     timeout: float = 30.0
     max_retries: int = 3
     secure: bool = False
+    channel_pool_size: int = 1
+    keepalive_time: float = 30.0
+    cache_size: int = 0
+    cache_ttl: float = 60.0
+    endpoints: Optional[List[str]] = None
+    load_balancing: str = "least_outstanding"
+    resolve_dns: bool = False
+    health_check_interval: float = 5.0
+    hedging: bool = True
+    hedge_quantile: float = 0.95
+    retry_budget: float = 0.1
 
     @classmethod
     def from_env(cls) -> "ClientConfig":
@@ -25,6 +37,24 @@ class ClientConfig:
             timeout=float(os.getenv("RESERVER_TIMEOUT", "30.0")),
             max_retries=int(os.getenv("RESERVER_MAX_RETRIES", "3")),
             secure=os.getenv("RESERVER_SECURE", "false").lower() == "true",
+            channel_pool_size=int(os.getenv("RESERVER_CHANNEL_POOL_SIZE", "1")),
+            keepalive_time=float(os.getenv("RESERVER_KEEPALIVE_TIME", "30.0")),
+            cache_size=int(os.getenv("RESERVER_CACHE_SIZE", "0")),
+            cache_ttl=float(os.getenv("RESERVER_CACHE_TTL", "60.0")),
+            endpoints=[
+                endpoint.strip()
+                for endpoint in os.getenv("RESERVER_ENDPOINTS", "").split(",")
+                if endpoint.strip()
+            ]
+            or None,
+            load_balancing=os.getenv("RESERVER_LOAD_BALANCING", "least_outstanding"),
+            resolve_dns=os.getenv("RESERVER_RESOLVE_DNS", "false").lower() == "true",
+            health_check_interval=float(
+                os.getenv("RESERVER_HEALTH_CHECK_INTERVAL", "5.0")
+            ),
+            hedging=os.getenv("RESERVER_HEDGING", "true").lower() == "true",
+            hedge_quantile=float(os.getenv("RESERVER_HEDGE_QUANTILE", "0.95")),
+            retry_budget=float(os.getenv("RESERVER_RETRY_BUDGET", "0.1")),
         )
 
     @property
@@ -3,13 +3,20 @@ Data models for Reranker Client SDK.
 """
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Union, overload
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
 
 
 @dataclass
 class RerankResult:
     """Represents a single reranking result."""
     
+    __slots__ = ("original_index", "score", "text")
+    
     original_index: int
     score: float
     text: str
@@ -34,28 +41,179 @@ class RerankRequest:
             raise ValueError("Documents cannot contain empty strings")
 
 
-@dataclass
+def _with_slots(cls: type) -> type:
+    """
+    Recreate a dataclass with `__slots__`, like `dataclass(slots=True)` does
+    on Python 3.10+. `cls.__slots__` is not set in the class body because it
+    would clash with the field defaults, which `__init__` already holds.
+    """
+    namespace = dict(cls.__dict__)
+    slots = namespace.pop("_slots")
+    for name in slots:
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = slots
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_with_slots
+@dataclass(eq=False)
 class RerankResponse:
-    """Represents a reranking response."""
+    """
+    Represents a reranking response.
+    
+    Responses built by the client wrap the protobuf message and only create
+    a RerankResult when it is accessed, so reading the top few results of a
+    large response does not convert all of them. `scores` and `indices`
+    expose the whole response as numpy arrays (built once, on first use) and
+    `get_by_original_index` is a dictionary lookup.
+    
+    `results` materializes every result into a list, which then backs all
+    other methods. The arrays and the index lookup are rebuilt when `results`
+    is assigned; after changing the list in place, assign it back.
+    """
+    
+    _slots = ("_proto", "_views", "_results", "_by_index", "_arrays", "partial")
     
     results: List[RerankResult]
+    # True when only some batches completed before a deadline
+    partial: bool = False
+    
+    @classmethod
+    def from_proto(cls, proto_results, partial: bool = False) -> "RerankResponse":
+        """Wrap the repeated `results` field of a protobuf response."""
+        response = cls.__new__(cls)
+        response._proto = proto_results
+        response._views = [None] * len(proto_results)
+        response._results = None
+        response._by_index = None
+        response._arrays = None
+        response.partial = partial
+        return response
+    
+    def _get_results(self) -> List[RerankResult]:
+        if self._results is None:
+            self._results = [self._result(i) for i in range(len(self._views))]
+            self._proto = None
+            self._views = []
+        return self._results
+    
+    def _set_results(self, results: List[RerankResult]) -> None:
+        self._results = results
+        self._proto = None
+        self._views: List[Optional[RerankResult]] = []
+        self._by_index: Optional[Dict[int, int]] = None
+        self._arrays: Optional[tuple] = None
+    
+    def _result(self, position: int) -> RerankResult:
+        if self._results is not None:
+            return self._results[position]
+        view = self._views[position]
+        if view is None:
+            proto_result = self._proto[position]
+            view = RerankResult(
+                original_index=proto_result.original_index,
+                score=proto_result.score,
+                text=proto_result.text,
+            )
+            self._views[position] = view
+        return view
     
     def __len__(self) -> int:
-        return len(self.results)
+        if self._results is not None:
+            return len(self._results)
+        return len(self._views)
     
-    def __iter__(self):
-        return iter(self.results)
+    def __iter__(self) -> Iterator[RerankResult]:
+        if self._results is not None:
+            return iter(self._results)
+        return (self._result(i) for i in range(len(self._views)))
     
-    def __getitem__(self, index: int) -> RerankResult:
-        return self.results[index]
+    @overload
+    def __getitem__(self, index: int) -> RerankResult: ...
+    
+    @overload
+    def __getitem__(self, index: slice) -> List[RerankResult]: ...
+    
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[RerankResult, List[RerankResult]]:
+        if self._results is not None:
+            return self._results[index]
+        if isinstance(index, slice):
+            return [self._result(i) for i in range(*index.indices(len(self._views)))]
+        if index < 0:
+            index += len(self._views)
+        if not 0 <= index < len(self._views):
+            raise IndexError("RerankResponse index out of range")
+        return self._result(index)
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RerankResponse):
+            return NotImplemented
+        return list(self) == list(other) and self.partial == other.partial
+    
+    def __reduce__(self) -> tuple:
+        # Protobuf containers cannot be pickled, pickle the results instead
+        return RerankResponse, (list(self), self.partial)
+    
+    def __repr__(self) -> str:
+        return f"RerankResponse(results={list(self)!r}, partial={self.partial!r})"
     
     def top_k(self, k: int) -> List[RerankResult]:
         """Get top k results."""
-        return self.results[:k]
+        return self[:k]
     
     def get_by_original_index(self, original_index: int) -> Optional[RerankResult]:
         """Get result by original document index."""
-        for result in self.results:
-            if result.original_index == original_index:
-                return result
-        return None
+        if self._by_index is None:
+            self._by_index = {
+                result.original_index: position for position, result in self._iter_raw()
+            }
+        position = self._by_index.get(original_index)
+        return None if position is None else self._result(position)
+    
+    def _iter_raw(self) -> Iterator[Any]:
+        """(position, result) pairs without creating RerankResult views."""
+        if self._results is not None:
+            return enumerate(self._results)
+        return enumerate(self._proto)
+    
+    def _score_arrays(self) -> tuple:
+        if np is None:
+            raise ImportError(
+                "numpy is required for score arrays, "
+                "install it with `pip install reserver-client[numpy]`"
+            )
+        if self._arrays is None:
+            count = len(self)
+            scores = np.fromiter(
+                (result.score for _, result in self._iter_raw()),
+                dtype=np.float32,
+                count=count,
+            )
+            indices = np.fromiter(
+                (result.original_index for _, result in self._iter_raw()),
+                dtype=np.int64,
+                count=count,
+            )
+            scores.flags.writeable = False
+            indices.flags.writeable = False
+            self._arrays = (scores, indices)
+        return self._arrays
+    
+    @property
+    def scores(self) -> "np.ndarray":
+        """Scores in ranked order, as a read-only float32 array."""
+        return self._score_arrays()[0]
+    
+    @property
+    def indices(self) -> "np.ndarray":
+        """Original document indices in ranked order, as a read-only array."""
+        return self._score_arrays()[1]
+
+
+RerankResponse.results = property(  # type: ignore[assignment]
+    RerankResponse._get_results, RerankResponse._set_results
+)
@@ -24,19 +24,35 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0ereranker.proto\x12\x08reranker\"1\n\rRerankRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x11\n\tdocuments\x18\x02 \x03(\t\"C\n\x0cRerankResult\x12\x16\n\x0eoriginal_index\x18\x01 \x01(\x05\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x0c\n\x04text\x18\x03 \x01(\t\"9\n\x0eRerankResponse\x12\'\n\x07results\x18\x01 \x03(\x0b\x32\x16.reranker.RerankResult2N\n\rRerankService\x12=\n\x06Rerank\x12\x17.reranker.RerankRequest\x1a\x18.reranker.RerankResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0ereranker.proto\x12\x08reranker\"\xbd\x01\n\rRerankRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x11\n\tdocuments\x18\x02 \x03(\t\x12\x12\n\x05top_k\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x16\n\tmin_score\x18\x04 \x01(\x02H\x01\x88\x01\x01\x12\x18\n\x0breturn_text\x18\x05 \x01(\x08H\x02\x88\x01\x01\x12\x12\n\x05model\x18\x06 \x01(\tH\x03\x88\x01\x01\x42\x08\n\x06_top_kB\x0c\n\n_min_scoreB\x0e\n\x0c_return_textB\x08\n\x06_model\"C\n\x0cRerankResult\x12\x16\n\x0eoriginal_index\x18\x01 \x01(\x05\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x0c\n\x04text\x18\x03 \x01(\t\"9\n\x0eRerankResponse\x12\'\n\x07results\x18\x01 \x03(\x0b\x32\x16.reranker.RerankResult\"+\n\x0fIndexedDocument\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04text\x18\x02 \x01(\t\"E\n\x15IndexDocumentsRequest\x12,\n\tdocuments\x18\x01 \x03(\x0b\x32\x19.reranker.IndexedDocument\"B\n\x16IndexDocumentsResponse\x12\x0f\n\x07indexed\x18\x01 \x01(\x05\x12\x17\n\x0ftotal_documents\x18\x02 \x01(\x03\"}\n\x12RerankByIdsRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x14\n\x0c\x64ocument_ids\x18\x02 \x03(\t\x12\x12\n\x05top_k\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x16\n\tmin_score\x18\x04 \x01(\x02H\x01\x88\x01\x01\x42\x08\n\x06_top_kB\x0c\n\n_min_score\"x\n\x13RerankStreamRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x11\n\tdocuments\x18\x02 \x03(\t\x12\x12\n\nchunk_size\x18\x03 \x01(\x05\x12\r\n\x05top_k\x18\x04 \x01(\x05\x12\x12\n\x05model\x18\x05 \x01(\tH\x00\x88\x01\x01\x42\x08\n\x06_model\"N\n\x14RerankStreamResponse\x12\'\n\x07results\x18\x01 \x03(\x0b\x32\x16.reranker.RerankResult\x12\r\n\x05\x66inal\x18\x02 \x01(\x08\"\xda\x01\n\x12RerankBatchRequest\x12\x0f\n\x07queries\x18\x01 \x03(\t\x12\x11\n\tdocuments\x18\x02 \x03(\t\x12\x12\n\x05top_k\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x16\n\tmin_score\x18\x04 \x01(\x02H\x01\x88\x01\x01\x12\x18\n\x0breturn_text\x18\x05 \x01(\x08H\x02\x88\x01\x01\x12\x12\n\x05model\x18\x06 \x01(\tH\x03\x88\x01\x01\x12\x14\n\x0cscore_matrix\x18\x07 \x01(\x08\x42\x08\n\x06_top_kB\x0c\n\n_min_scoreB\x0e\n\x0c_return_textB\x08\n\x06_model\"R\n\x13RerankBatchResponse\x12+\n\tresponses\x18\x01 \x03(\x0b\x32\x18.reranker.RerankResponse\x12\x0e\n\x06scores\x18\x02 \x03(\x02\x32\xe8\x03\n\rRerankService\x12=\n\x06Rerank\x12\x17.reranker.RerankRequest\x1a\x18.reranker.RerankResponse\"\x00\x12U\n\x0eIndexDocuments\x12\x1f.reranker.IndexDocumentsRequest\x1a .reranker.IndexDocumentsResponse\"\x00\x12G\n\x0bRerankByIds\x12\x1c.reranker.RerankByIdsRequest\x1a\x18.reranker.RerankResponse\"\x00\x12Q\n\x0cRerankStream\x12\x1d.reranker.RerankStreamRequest\x1a\x1e.reranker.RerankStreamResponse\"\x00\x30\x01\x12W\n\x10RerankBidiStream\x12\x1d.reranker.RerankStreamRequest\x1a\x1e.reranker.RerankStreamResponse\"\x00(\x01\x30\x01\x12L\n\x0bRerankBatch\x12\x1c.reranker.RerankBatchRequest\x1a\x1d.reranker.RerankBatchResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'reranker_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_RERANKREQUEST']._serialized_start=28
-  _globals['_RERANKREQUEST']._serialized_end=77
-  _globals['_RERANKRESULT']._serialized_start=79
-  _globals['_RERANKRESULT']._serialized_end=146
-  _globals['_RERANKRESPONSE']._serialized_start=148
-  _globals['_RERANKRESPONSE']._serialized_end=205
-  _globals['_RERANKSERVICE']._serialized_start=207
-  _globals['_RERANKSERVICE']._serialized_end=285
+  _globals['_RERANKREQUEST']._serialized_start=29
+  _globals['_RERANKREQUEST']._serialized_end=218
+  _globals['_RERANKRESULT']._serialized_start=220
+  _globals['_RERANKRESULT']._serialized_end=287
+  _globals['_RERANKRESPONSE']._serialized_start=289
+  _globals['_RERANKRESPONSE']._serialized_end=346
+  _globals['_INDEXEDDOCUMENT']._serialized_start=348
+  _globals['_INDEXEDDOCUMENT']._serialized_end=391
+  _globals['_INDEXDOCUMENTSREQUEST']._serialized_start=393
+  _globals['_INDEXDOCUMENTSREQUEST']._serialized_end=462
+  _globals['_INDEXDOCUMENTSRESPONSE']._serialized_start=464
+  _globals['_INDEXDOCUMENTSRESPONSE']._serialized_end=530
+  _globals['_RERANKBYIDSREQUEST']._serialized_start=532
+  _globals['_RERANKBYIDSREQUEST']._serialized_end=657
+  _globals['_RERANKSTREAMREQUEST']._serialized_start=659
+  _globals['_RERANKSTREAMREQUEST']._serialized_end=779
+  _globals['_RERANKSTREAMRESPONSE']._serialized_start=781
+  _globals['_RERANKSTREAMRESPONSE']._serialized_end=859
+  _globals['_RERANKBATCHREQUEST']._serialized_start=862
+  _globals['_RERANKBATCHREQUEST']._serialized_end=1080
+  _globals['_RERANKBATCHRESPONSE']._serialized_start=1082
+  _globals['_RERANKBATCHRESPONSE']._serialized_end=1164
+  _globals['_RERANKSERVICE']._serialized_start=1167
+  _globals['_RERANKSERVICE']._serialized_end=1655
 # @@protoc_insertion_point(module_scope)
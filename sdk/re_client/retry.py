@@ -0,0 +1,62 @@
+"""
+Retry budget and backoff shared by the client and `retry_on_failure`.
+"""
+
+import random
+import threading
+import time
+
+
+def backoff_delay(
+    attempt: int, base: float, factor: float = 2.0, maximum: float = 30.0
+) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0 for the first).
+
+    Full jitter: a uniformly random delay up to the exponential backoff, so
+    clients that failed together do not retry together.
+    """
+    return random.uniform(0.0, min(maximum, base * factor**attempt))
+
+
+class RetryBudget:
+    """
+    Limits retries (and hedged requests) to a fraction of all calls.
+
+    Every call deposits `ratio` tokens and every retry withdraws one, so
+    when a server is down retries add at most `ratio` extra load instead of
+    multiplying it by the number of attempts. `reserve_per_second` tokens
+    are added over time so that rarely used clients can still retry.
+    Thread-safe; one budget can be shared by several clients.
+    """
+
+    def __init__(self, ratio: float = 0.1, reserve_per_second: float = 5.0):
+        self.ratio = ratio
+        self.reserve_per_second = reserve_per_second
+        self._max_tokens = max(10.0, reserve_per_second * 10)
+        self._tokens = reserve_per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._max_tokens,
+            self._tokens + (now - self._updated) * self.reserve_per_second,
+        )
+        self._updated = now
+
+    def deposit(self) -> None:
+        """Record a call."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take the budget for one retry, False when it is exhausted."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
@@ -2,12 +2,28 @@
 Utility functions for ReServer Client SDK.
 """
 
+import asyncio
+import heapq
+import itertools
 import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import as_completed
 from functools import wraps
-from typing import Callable, List, Optional
-
-from .exceptions import ReServerClientError
+from typing import Callable, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from .exceptions import (
+    ReServerClientError,
+    ReServerTimeoutError,
+    ReServerValidationError,
+)
 from .models import RerankResponse, RerankResult
+from .retry import RetryBudget, backoff_delay
 
 
 def retry_on_failure(
@@ -15,83 +31,281 @@ def retry_on_failure(
     delay: float = 1.0,
     backoff_factor: float = 2.0,
     exceptions: tuple = (ReServerClientError,),
+    max_delay: float = 30.0,
+    budget: Optional[RetryBudget] = None,
 ):
     """
     Decorator to retry function calls on failure.
 
+    Works on regular and async functions; async ones back off with
+    `asyncio.sleep` so the event loop keeps running. Each wait is a random
+    delay up to the exponential backoff (full jitter). Validation errors are
+    never retried, since repeating the call cannot fix them.
+
     Args:
         max_retries: Maximum number of retry attempts
         delay: Initial delay between retries
         backoff_factor: Multiplier for delay on each retry
         exceptions: Tuple of exceptions to catch and retry on
+        max_delay: Upper bound of a single delay
+        budget: Optional RetryBudget shared across calls; retries stop when
+            it is exhausted instead of piling onto a struggling server
     """
 
+    def should_retry(error: Exception, attempt: int) -> bool:
+        if isinstance(error, ReServerValidationError) or attempt >= max_retries:
+            return False
+        return budget is None or budget.withdraw()
+
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if budget is not None:
+                    budget.deposit()
+                for attempt in itertools.count():
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        if not should_retry(e, attempt):
+                            raise
+                    await asyncio.sleep(
+                        backoff_delay(attempt, delay, backoff_factor, max_delay)
+                    )
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
-            current_delay = delay
-
-            for attempt in range(max_retries + 1):
+            if budget is not None:
+                budget.deposit()
+            for attempt in itertools.count():
                 try:
                     return func(*args, **kwargs)
                 except exceptions as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        time.sleep(current_delay)
-                        current_delay *= backoff_factor
-                    else:
-                        raise last_exception
-
-            return None  # Should never reach here
+                    if not should_retry(e, attempt):
+                        raise
+                time.sleep(backoff_delay(attempt, delay, backoff_factor, max_delay))
 
         return wrapper
 
     return decorator
 
 
+class _TopKMerger:
+    """
+    Merges per-batch responses as they arrive.
+
+    With `top_k` only the k best results seen so far are kept in a min-heap,
+    so memory stays bounded by k. Results are only copied into new
+    RerankResult objects (with global indices) when the merged response is
+    built.
+    """
+
+    def __init__(self, top_k: Optional[int]):
+        self.top_k = top_k
+        self._heap: List[Tuple[float, int, int, RerankResult]] = []
+        self._batches: List[Tuple[int, List[RerankResult]]] = []
+        # Set when some batches did not complete before the deadline
+        self.partial = False
+
+    def add(self, offset: int, response: RerankResponse) -> None:
+        if self.top_k is None:
+            self._batches.append((offset, response.results))
+            return
+
+        for result in response:
+            # Ties keep the lower document index, like a stable sort would
+            item = (result.score, -(offset + result.original_index), offset, result)
+            if len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, item)
+            elif item > self._heap[0]:
+                heapq.heapreplace(self._heap, item)
+            else:
+                # Batch results are sorted, nothing further can make it
+                break
+
+    def response(self) -> RerankResponse:
+        if self.top_k is None:
+            # Each batch is already sorted, merge instead of re-sorting
+            ranked: Iterable[Tuple[int, RerankResult]] = heapq.merge(
+                *[[(offset, r) for r in results] for offset, results in self._batches],
+                key=lambda item: (-item[1].score, item[0] + item[1].original_index),
+            )
+        else:
+            ranked = [
+                (offset, result)
+                for _, _, offset, result in sorted(self._heap, reverse=True)
+            ]
+
+        results = [
+            RerankResult(
+                original_index=offset + result.original_index,
+                score=result.score,
+                text=result.text,
+            )
+            for offset, result in ranked
+        ]
+        return RerankResponse(results=results, partial=self.partial)
+
+
+def _remaining(deadline_at: Optional[float]) -> Optional[float]:
+    if deadline_at is None:
+        return None
+    return max(0.0, deadline_at - time.monotonic())
+
+
+def _batch_timeout(
+    client, timeout: Optional[float], deadline_at: Optional[float]
+) -> float:
+    """
+    Timeout of one batch request, capped by the overall deadline.
+
+    Raises ReServerTimeoutError once the deadline has passed, so batches that
+    start late fail instead of running with the default timeout.
+    """
+    batch_timeout = timeout or client.timeout
+    remaining = _remaining(deadline_at)
+    if remaining is not None:
+        if remaining <= 0:
+            raise ReServerTimeoutError("Batch rerank deadline exceeded")
+        batch_timeout = min(batch_timeout, remaining)
+    return batch_timeout
+
+
 def batch_rerank(
     client,
     query: str,
     documents: List[str],
     batch_size: int = 100,
     timeout: Optional[float] = None,
+    max_in_flight: int = 4,
+    top_k: Optional[int] = None,
+    deadline: Optional[float] = None,
+    partial: bool = False,
 ) -> RerankResponse:
     """
     Rerank documents in batches for large document sets.
 
+    Up to `max_in_flight` batches are sent concurrently and merged as they
+    complete. As soon as one batch fails, the batches that have not started
+    are cancelled and the error is raised.
+
     Args:
         client: ReServerClient instance
         query: Search query
         documents: List of documents to rerank
         batch_size: Number of documents per batch
         timeout: Request timeout per batch
+        max_in_flight: Maximum number of concurrent batch requests
+        top_k: Only return the k best results overall (each batch is also
+            cut to k server-side)
+        deadline: Seconds the whole call may take
+        partial: When the deadline is reached, return the results of the
+            completed batches (with `partial=True`) instead of raising
+            ReServerTimeoutError
 
     Returns:
         Combined RerankResponse with all results
     """
-    if len(documents) <= batch_size:
-        return client.rerank(query, documents, timeout=timeout)
-
-    all_results = []
-
-    for i in range(0, len(documents), batch_size):
-        batch_docs = documents[i : i + batch_size]
-        batch_response = client.rerank(query, batch_docs, timeout=timeout)
+    deadline_at = None if deadline is None else time.monotonic() + deadline
+    if len(documents) <= batch_size and deadline_at is None:
+        return client.rerank(query, documents, timeout=timeout, top_k=top_k)
+
+    merger = _TopKMerger(top_k)
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def rerank_batch(batch_docs: List[str]) -> RerankResponse:
+        return client.rerank(
+            query,
+            batch_docs,
+            timeout=_batch_timeout(client, timeout, deadline_at),
+            top_k=top_k,
+        )
+
+    futures = {
+        executor.submit(rerank_batch, documents[i : i + batch_size]): i
+        for i in range(0, len(documents), batch_size)
+    }
+    try:
+        for future in as_completed(futures, timeout=_remaining(deadline_at)):
+            try:
+                merger.add(futures[future], future.result())
+            except ReServerTimeoutError:
+                if not partial:
+                    raise
+                merger.partial = True
+    except FuturesTimeoutError:
+        if not partial:
+            raise ReServerTimeoutError(f"Batch rerank timed out after {deadline}s")
+        merger.partial = True
+    finally:
+        # Batches already sent finish on their own (bounded by the deadline)
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    return merger.response()
+
+
+async def batch_rerank_async(
+    client,
+    query: str,
+    documents: List[str],
+    batch_size: int = 100,
+    timeout: Optional[float] = None,
+    max_in_flight: int = 4,
+    top_k: Optional[int] = None,
+    deadline: Optional[float] = None,
+    partial: bool = False,
+) -> RerankResponse:
+    """
+    Rerank documents in concurrent batches using `rerank_async()`.
 
-        # Adjust original indices to account for batching
-        for result in batch_response.results:
-            adjusted_result = RerankResult(
-                original_index=result.original_index + i,
-                score=result.score,
-                text=result.text,
+    Same parameters and results as `batch_rerank()`. Batches still in flight
+    when the call fails or reaches its deadline are cancelled.
+    """
+    deadline_at = None if deadline is None else time.monotonic() + deadline
+    if len(documents) <= batch_size and deadline_at is None:
+        return await client.rerank_async(query, documents, timeout=timeout, top_k=top_k)
+
+    merger = _TopKMerger(top_k)
+    slots = asyncio.Semaphore(max_in_flight)
+
+    async def rerank_batch(offset: int) -> Tuple[int, RerankResponse]:
+        async with slots:
+            response = await client.rerank_async(
+                query,
+                documents[offset : offset + batch_size],
+                timeout=_batch_timeout(client, timeout, deadline_at),
+                top_k=top_k,
             )
-            all_results.append(adjusted_result)
-
-    # Sort all results by score
-    all_results.sort(key=lambda x: x.score, reverse=True)
+            return offset, response
 
-    return RerankResponse(results=all_results)
+    tasks = [
+        asyncio.ensure_future(rerank_batch(i))
+        for i in range(0, len(documents), batch_size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=_remaining(deadline_at)):
+            try:
+                offset, response = await next_done
+            except ReServerTimeoutError:
+                if not partial:
+                    raise
+                merger.partial = True
+                continue
+            merger.add(offset, response)
+    except asyncio.TimeoutError:
+        if not partial:
+            raise ReServerTimeoutError(f"Batch rerank timed out after {deadline}s")
+        merger.partial = True
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return merger.response()
 
 
 def filter_by_score_threshold(
@@ -107,9 +321,7 @@ def filter_by_score_threshold(
     Returns:
         Filtered RerankResponse
     """
-    filtered_results = [
-        result for result in response.results if result.score >= threshold
-    ]
+    filtered_results = [result for result in response if result.score >= threshold]
 
     return RerankResponse(results=filtered_results)
 
@@ -128,12 +340,10 @@ def get_top_k_with_threshold(
     Returns:
         Filtered RerankResponse with top k results
     """
-    results = response.results
-
-    if threshold is not None:
-        results = [r for r in results if r.score >= threshold]
-
-    top_k_results = results[:k]
+    if threshold is None:
+        top_k_results = response[:k]
+    else:
+        top_k_results = [r for r in response if r.score >= threshold][:k]
 
     return RerankResponse(results=top_k_results)
 
@@ -148,7 +358,7 @@ def calculate_score_statistics(response: RerankResponse) -> dict:
     Returns:
         Dictionary with score statistics
     """
-    if not response.results:
+    if not len(response):
         return {
             "count": 0,
             "min_score": 0.0,
@@ -157,8 +367,17 @@ def calculate_score_statistics(response: RerankResponse) -> dict:
             "median_score": 0.0,
         }
 
-    scores = [result.score for result in response.results]
-    scores.sort()
+    if np is not None:
+        scores_array = response.scores
+        return {
+            "count": len(scores_array),
+            "min_score": float(scores_array.min()),
+            "max_score": float(scores_array.max()),
+            "mean_score": float(scores_array.mean(dtype=np.float64)),
+            "median_score": float(np.median(scores_array)),
+        }
+
+    scores = sorted(result.score for result in response)
 
     count = len(scores)
     min_score = scores[0]
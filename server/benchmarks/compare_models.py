@@ -0,0 +1,211 @@
+"""Compare model variants (e.g. fp32, dynamic int8, ORT-optimized graphs).
+
+Every variant runs the same rerank requests in a fresh process. The harness
+reports latency percentiles, throughput, resident memory, and how closely its
+rankings agree with the reference variant.
+
+    cd server
+    python benchmarks/compare_models.py \\
+        --models fp32=model/onnx_full/model.onnx,int8=model/onnx_opt/model_quantized.onnx \\
+        --tokenizer model/onnx_full/tokenizer.json
+
+--models uses the MODEL_VARIANTS syntax of the server. The first variant is
+the reference unless --reference is given. --data takes a JSON-lines file of
+{"query": ..., "documents": [...]} requests; without it, synthetic requests
+are generated.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import psutil
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from server import parse_model_variants  # noqa: E402
+from worker.inference import (  # noqa: E402
+    inference_and_score,
+    start_session,
+    start_tokenizer,
+)
+
+MAX_LEN_Q = 32
+MAX_LEN_D = 180
+
+WORDS = (
+    "python package manager install dependencies fast rust compiler memory "
+    "server request latency throughput model query document search ranking "
+    "vector index cache thread process network database storage cloud sky "
+    "blue beautiful day history empire recipe chocolate cake river mountain"
+).split()
+
+
+def synthetic_requests(count: int, documents: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "query": " ".join(rng.choices(WORDS, k=rng.randint(3, 8))),
+            "documents": [
+                " ".join(rng.choices(WORDS, k=rng.randint(10, 150)))
+                for _ in range(documents)
+            ],
+        }
+        for _ in range(count)
+    ]
+
+
+def load_requests(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_variant(
+    name: str, model_path: str, tokenizer_path: str, requests: list[dict], warmup: int
+) -> dict:
+    """Benchmark one variant, runs in its own process"""
+    start_tokenizer(tokenizer_path)
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    start_session({name: model_path})
+    rss_loaded = process.memory_info().rss
+
+    for request in requests[:warmup]:
+        inference_and_score(
+            request["query"], request["documents"], MAX_LEN_Q, MAX_LEN_D, name
+        )
+
+    latencies = []
+    scores = []
+    started = time.perf_counter()
+    for request in requests:
+        t = time.perf_counter()
+        scores.append(
+            inference_and_score(
+                request["query"], request["documents"], MAX_LEN_Q, MAX_LEN_D, name
+            )
+        )
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    documents = sum(len(request["documents"]) for request in requests)
+    return {
+        "model": name,
+        "path": model_path,
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p95": float(np.percentile(latencies_ms, 95)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "mean": float(latencies_ms.mean()),
+        },
+        "requests_per_s": len(requests) / elapsed,
+        "documents_per_s": documents / elapsed,
+        "model_memory_mb": (rss_loaded - rss_before) / 2**20,
+        "peak_rss_mb": process.memory_info().rss / 2**20,
+        "scores": [s.tolist() for s in scores],
+    }
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values, kind="stable")] = np.arange(len(values))
+    return ranks
+
+
+def agreement(reference: list[list[float]], scores: list[list[float]], k: int) -> dict:
+    """Ranking agreement of a variant with the reference, averaged per request"""
+    overlaps, correlations, max_diffs = [], [], []
+    for ref, var in zip(reference, scores):
+        ref, var = np.asarray(ref), np.asarray(var)
+        top = min(k, len(ref))
+        ref_top = set(np.argsort(-ref, kind="stable")[:top].tolist())
+        var_top = set(np.argsort(-var, kind="stable")[:top].tolist())
+        overlaps.append(len(ref_top & var_top) / top)
+        if len(ref) > 1:
+            # Spearman correlation: Pearson correlation of the ranks
+            correlations.append(float(np.corrcoef(_ranks(ref), _ranks(var))[0, 1]))
+        max_diffs.append(float(np.abs(ref - var).max()))
+    return {
+        f"top{k}_overlap": float(np.mean(overlaps)),
+        "spearman": float(np.mean(correlations)) if correlations else 1.0,
+        "max_score_diff": float(np.max(max_diffs)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", required=True, help="name=path,name=path")
+    parser.add_argument("--tokenizer", default="model/onnx_full/tokenizer.json")
+    parser.add_argument("--reference", default="", help="variant to compare against")
+    parser.add_argument("--data", default="", help="JSON-lines file of requests")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--documents", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="write the report as JSON")
+    args = parser.parse_args()
+
+    models = parse_model_variants(args.models)
+    reference = args.reference or next(iter(models))
+    if reference not in models:
+        parser.error(f"Unknown reference variant {reference!r}")
+
+    requests = (
+        load_requests(args.data)
+        if args.data
+        else synthetic_requests(args.requests, args.documents, args.seed)
+    )
+
+    results = {}
+    for name, path in models.items():
+        # A fresh process per variant keeps memory numbers and caches separate
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results[name] = executor.submit(
+                run_variant, name, path, args.tokenizer, requests, args.warmup
+            ).result()
+
+    reference_scores = results[reference]["scores"]
+    for result in results.values():
+        result["agreement"] = agreement(
+            reference_scores, result.pop("scores"), args.top_k
+        )
+
+    header = (
+        f"{'MODEL':<12} | {'P50 MS':>8} | {'P95 MS':>8} | {'DOCS/S':>9} | "
+        f"{'MEM MB':>8} | {f'TOP{args.top_k}':>6} | {'SPEARMAN':>8} | {'MAX DIFF':>8}"
+    )
+    print(f"{len(requests)} requests, reference: {reference}\n")
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        latency, agree = result["latency_ms"], result["agreement"]
+        print(
+            f"{name:<12} | {latency['p50']:>8.2f} | {latency['p95']:>8.2f} | "
+            f"{result['documents_per_s']:>9.1f} | {result['model_memory_mb']:>8.1f} | "
+            f"{agree[f'top{args.top_k}_overlap']:>6.3f} | {agree['spearman']:>8.4f} | "
+            f"{agree['max_score_diff']:>8.4f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"reference": reference, "requests": len(requests), "models": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
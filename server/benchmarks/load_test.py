@@ -0,0 +1,297 @@
+"""Load test of the gRPC server across workloads and server settings.
+
+Starts the server locally once per server configuration (POOL_SIZE and
+RUN_SINGLE_THREADED combinations, plus any --server-env), then sweeps
+document count, document length and client concurrency against it. Every
+scenario reports throughput and p50/p95/p99 latency. Results are written as
+JSON and can be compared against a stored baseline to catch regressions.
+
+    cd server
+    python benchmarks/load_test.py \\
+        --documents 10,100 --doc-words 30,150 --concurrency 1,8 \\
+        --pool-sizes 1,4 --single-threaded false,true \\
+        --output results.json --baseline baseline.json
+
+The client runs on the same machine and takes some CPU away from the server,
+so compare results from the same host only.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import grpc
+import numpy as np
+from grpc import aio
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(SERVER_DIR, "src"))
+
+from reranker_pb2 import RerankRequest  # noqa: E402
+from reranker_pb2_grpc import RerankServiceStub  # noqa: E402
+
+WORDS = (
+    "python package manager install dependencies fast rust compiler memory "
+    "server request latency throughput model query document search ranking "
+    "vector index cache thread process network database storage cloud sky "
+    "blue beautiful day history empire recipe chocolate cake river mountain"
+).split()
+
+# Metrics compared against the baseline, and whether higher is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "latency_p99_ms": False,
+}
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _bool_list(value: str) -> list[bool]:
+    return [item.strip().lower() == "true" for item in value.split(",") if item]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SERVER_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+@contextlib.contextmanager
+def running_server(port: int, env: dict[str, str], log_path: str):
+    """Run the server with `env` until the block exits"""
+    server_env = dict(os.environ, PYTHONPATH="src", SERVER_PORT=str(port), **env)
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "."],
+            cwd=SERVER_DIR,
+            env=server_env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            with grpc.insecure_channel(f"localhost:{port}") as channel:
+                grpc.channel_ready_future(channel).result(timeout=300)
+            yield
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def make_requests(count: int, documents: int, doc_words: int, seed: int) -> list:
+    """Distinct requests, so the embedding cache does not serve repeats"""
+    rng = random.Random(seed)
+    return [
+        RerankRequest(
+            query=" ".join(rng.choices(WORDS, k=6)),
+            documents=[
+                " ".join(rng.choices(WORDS, k=doc_words)) for _ in range(documents)
+            ],
+        )
+        for _ in range(count)
+    ]
+
+
+async def run_scenario(
+    port: int, requests: list, concurrency: int, warmup: int, timeout: float
+) -> dict:
+    """Closed-loop load: `concurrency` clients send requests back to back"""
+    latencies: list[float] = []
+    errors = 0
+
+    async with aio.insecure_channel(f"localhost:{port}") as channel:
+        stub = RerankServiceStub(channel)
+        for request in requests[:warmup]:
+            await stub.Rerank(request, timeout=timeout)
+
+        pending = iter(requests)
+
+        async def client():
+            nonlocal errors
+            for request in pending:
+                started = time.perf_counter()
+                try:
+                    await stub.Rerank(request, timeout=timeout)
+                    latencies.append(time.perf_counter() - started)
+                except grpc.RpcError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies or [0.0]) * 1000
+    documents = len(requests[0].documents)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": duration,
+        "throughput_rps": len(latencies) / duration,
+        "documents_per_s": len(latencies) * documents / duration,
+        "latency_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "latency_p95_ms": float(np.percentile(latencies_ms, 95)),
+        "latency_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "latency_mean_ms": float(latencies_ms.mean()),
+        "latency_max_ms": float(latencies_ms.max()),
+    }
+
+
+def scenario_key(config: dict) -> str:
+    return ",".join(f"{key}={config[key]}" for key in sorted(config))
+
+
+def compare(results: list[dict], baseline: dict, max_regression: float) -> list[str]:
+    """Describe every metric that got worse than the baseline by more than
+    `max_regression` (a fraction)"""
+    previous = {scenario_key(r["config"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = scenario_key(result["config"])
+        if key not in previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous[key][metric], result[metric]
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > max_regression:
+                regressions.append(
+                    f"{key}: {metric} {old:.2f} -> {new:.2f} ({change:+.1%})"
+                )
+    return regressions
+
+
+def print_result(result: dict) -> None:
+    config = result["config"]
+    print(
+        f"pool={config['pool_size']:<2} single={str(config['single_threaded']):<5} "
+        f"docs={config['documents']:<4} words={config['doc_words']:<4} "
+        f"conc={config['concurrency']:<3} | {result['throughput_rps']:8.1f} req/s | "
+        f"p50 {result['latency_p50_ms']:8.2f} ms | "
+        f"p95 {result['latency_p95_ms']:8.2f} ms | "
+        f"p99 {result['latency_p99_ms']:8.2f} ms | errors {result['errors']}",
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=_int_list, default=[10, 100])
+    parser.add_argument("--doc-words", type=_int_list, default=[30, 150])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8])
+    parser.add_argument("--pool-sizes", type=_int_list, default=[1])
+    parser.add_argument("--single-threaded", type=_bool_list, default=[False])
+    parser.add_argument(
+        "--server-env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="extra server environment, e.g. MODEL_PATH=... (repeatable)",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--port", type=int, default=50151)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="write results as JSON")
+    parser.add_argument("--baseline", default="", help="JSON results to compare to")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.10,
+        help="tolerated relative slowdown before failing (default 0.10)",
+    )
+    parser.add_argument("--server-log", default="load_test_server.log")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.server_env)
+    workloads = {
+        (documents, doc_words): make_requests(
+            args.requests + args.warmup, documents, doc_words, args.seed
+        )
+        for documents, doc_words in itertools.product(args.documents, args.doc_words)
+    }
+
+    results = []
+    for pool_size, single_threaded in itertools.product(
+        args.pool_sizes, args.single_threaded
+    ):
+        env = dict(
+            extra_env,
+            POOL_SIZE=str(pool_size),
+            RUN_SINGLE_THREADED=str(single_threaded).lower(),
+        )
+        with running_server(args.port, env, args.server_log):
+            for (documents, doc_words), requests in workloads.items():
+                for concurrency in args.concurrency:
+                    result = asyncio.run(
+                        run_scenario(
+                            args.port,
+                            requests[args.warmup :],
+                            concurrency,
+                            args.warmup,
+                            args.timeout,
+                        )
+                    )
+                    result["config"] = {
+                        "pool_size": pool_size,
+                        "single_threaded": single_threaded,
+                        "documents": documents,
+                        "doc_words": doc_words,
+                        "concurrency": concurrency,
+                        **extra_env,
+                    }
+                    print_result(result)
+                    results.append(result)
+
+    report = {
+        "metadata": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_scenario": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Microbenchmark of the MaxSim scoring engine.
+
+Scores random, unit-normalized token embeddings of variable length with the
+previous dense implementation and with `worker.scoring.maxsim`. Reports the
+median time, the peak memory of temporaries and the largest score difference.
+Parity is asserted by the unit tests in tests/test_scoring.py.
+
+    cd server
+    python benchmarks/scoring.py --documents 1000 --dim 128
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from worker.scoring import maxsim  # noqa: E402
+
+
+def dense_scores(Q_emb, D_emb, q_mask, d_mask):
+    """The implementation maxsim replaced: one (n_docs, Lq, Ld) tensor"""
+    scores_matrix = np.matmul(Q_emb, np.transpose(D_emb, (0, 2, 1)))
+    scores_matrix = np.where(d_mask[:, None, :] == 1, scores_matrix, -np.inf)
+    max_scores = np.max(scores_matrix, axis=2)
+    return np.sum(max_scores[:, q_mask[0] == 1], axis=1)
+
+
+def random_batch(rng, documents, dim, max_len_q, max_len_d):
+    def embed(n, max_len, min_len):
+        lengths = rng.integers(min_len, max_len + 1, size=n)
+        mask = (np.arange(max_len) < lengths[:, None]).astype(np.int64)
+        emb = rng.standard_normal((n, max_len, dim)).astype(np.float32)
+        emb /= np.linalg.norm(emb, axis=2, keepdims=True)
+        return emb * mask[:, :, None], mask
+
+    Q_emb, q_mask = embed(1, max_len_q, max_len_q // 2)
+    D_emb, d_mask = embed(documents, max_len_d, 8)
+    return Q_emb, q_mask, D_emb, d_mask
+
+
+def measure(func, repeats):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, float(np.median(times)) * 1000, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--max-len-q", type=int, default=32)
+    parser.add_argument("--max-len-d", type=int, default=180)
+    parser.add_argument("--chunk-tokens", type=int, default=4096)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    Q_emb, q_mask, D_emb, d_mask = random_batch(
+        rng, args.documents, args.dim, args.max_len_q, args.max_len_d
+    )
+
+    reference, dense_ms, dense_mb = measure(
+        lambda: dense_scores(Q_emb, D_emb, q_mask, d_mask), args.repeats
+    )
+
+    header = (
+        f"{'IMPLEMENTATION':<16} | {'MEDIAN MS':>9} | {'PEAK MB':>8} | "
+        f"{'MAX DIFF':>8}"
+    )
+    print(f"{args.documents} documents, dim {args.dim}\n")
+    print(header)
+    print("-" * len(header))
+    print(f"{'dense':<16} | {dense_ms:>9.2f} | {dense_mb:>8.1f} | {0:>8.4f}")
+
+    scores, ms, mb = measure(
+        lambda: maxsim(Q_emb, q_mask, D_emb, d_mask, args.chunk_tokens)[0],
+        args.repeats,
+    )
+    diff = float(np.abs(scores - reference).max())
+    print(f"{'maxsim':<16} | {ms:>9.2f} | {mb:>8.1f} | {diff:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
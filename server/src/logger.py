@@ -1,20 +1,58 @@
+import atexit
+import inspect
+import json
 import logging
+import os
+import queue
+import random
+import threading
 import time
+from contextvars import ContextVar
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
 
 from psutil import cpu_percent, virtual_memory
 
+# Records waiting for the background writer; when it is full new records are
+# dropped instead of blocking the caller
+LOG_QUEUE_SIZE = 10000
 
-def _get_machine_stats():
-    try:
-        return {
-            "cpu": f"CPU: {cpu_percent()}%",
-            "ram": f"MEM: {virtual_memory().percent}%",
-        }
+# Whether the current request's INFO and DEBUG records are kept, see log_time
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+_configure_lock = threading.Lock()
+_listener: QueueListener | None = None
+
+
+class _MachineStats:
+    """CPU and memory usage, refreshed at most once per `interval` seconds so
+    formatting a record does not query the system"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stats = {"cpu": "-", "ram": "-"}
+        self._updated = float("-inf")
 
-    except Exception as e:
-        print(f"Error getting machine stats: {e}")
-        return {"cpu": "-", "ram": "-"}
+    def get(self) -> dict:
+        now = time.monotonic()
+        if now - self._updated >= self.interval:
+            self._updated = now
+            try:
+                self._stats = {
+                    "cpu": f"CPU: {cpu_percent()}%",
+                    "ram": f"MEM: {virtual_memory().percent}%",
+                }
+            except Exception as e:
+                print(f"Error getting machine stats: {e}")
+                self._stats = {"cpu": "-", "ram": "-"}
+        return self._stats
+
+
+_machine_stats = _MachineStats(float(os.getenv("LOG_STATS_INTERVAL", "5")))
+
+
+def _get_machine_stats():
+    return _machine_stats.get()
 
 
 def _colored(text, color_name):
@@ -39,37 +77,140 @@ class MachineAwareLoggerFormatter(logging.Formatter):
         return super().format(record)
 
 
-def get_logger():
-    logger = logging.getLogger(__name__)
-    if logger.hasHandlers():
-        logger.handlers.clear()
-    logger.setLevel(logging.INFO)
-    logger.addHandler(logging.StreamHandler())
+# Attributes every LogRecord has, anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonLoggerFormatter(logging.Formatter):
+    """One JSON object per record, including the fields passed as `extra`"""
+
+    def format(self, record):
+        machine_stats = _get_machine_stats()
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+            "cpu": machine_stats["cpu"],
+            "ram": machine_stats["ram"],
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _RequestSamplingFilter(logging.Filter):
+    """Drops INFO and DEBUG records of requests that were not sampled"""
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or _request_sampled.get()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Hands records to the background writer without ever blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonLoggerFormatter()
     asctime_str = _colored("%(asctime)s", "blue")
     levelname_str = _colored("%(levelname)s", "green")
     message_str = _colored("%(message)s", "white")
     cpu_str = _colored("%(cpu)s", "yellow")
     ram_str = _colored("%(ram)s", "magenta")
-    logger.handlers[0].setFormatter(
-        MachineAwareLoggerFormatter(
-            f"[{asctime_str}] [{levelname_str}] {message_str} [{cpu_str}] [{ram_str}]"
-        )
+    return MachineAwareLoggerFormatter(
+        f"[{asctime_str}] [{levelname_str}] {message_str} [{cpu_str}] [{ram_str}]"
     )
+
+
+def get_logger():
+    """The server logger, configured on first use.
+
+    Records are put on a bounded queue and formatted and written by a
+    background thread, so logging only costs the caller a queue insertion.
+    LOG_FORMAT selects `text` (default) or `json` output and LOG_LEVEL the
+    level.
+    """
+    global _listener
+    logger = logging.getLogger(__name__)
+    with _configure_lock:
+        if _listener is not None:
+            return logger
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(_formatter(os.getenv("LOG_FORMAT", "text")))
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        _listener = QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        logger.handlers.clear()
+        logger.addHandler(_DroppingQueueHandler(log_queue))
+        logger.addFilter(_RequestSamplingFilter())
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        logger.propagate = False
     return logger
 
 
-def log_time(logger):
+def _sample_request(sample_rate: float) -> None:
+    _request_sampled.set(sample_rate >= 1.0 or random.random() < sample_rate)
+
+
+def log_time(logger, sample_rate: float | None = None):
     """
-    Logs the time it took to execute a async function
+    Logs the time it took to execute a async function (or to exhaust an
+    async generator).
+
+    Only a `sample_rate` fraction of the calls (LOG_SAMPLE_RATE by default)
+    keep their INFO and DEBUG records, warnings and errors are always logged.
     """
+    if sample_rate is None:
+        sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
 
     def decorator(func):
+        method = func.__name__
+
+        def log_duration(start):
+            duration = time.perf_counter() - start
+            logger.info(
+                "Function %s took %.6f seconds",
+                method,
+                duration,
+                extra={"method": method, "duration_s": duration},
+            )
+
+        if inspect.isasyncgenfunction(func):
+
+            @wraps(func)
+            async def stream_wrapper(*args, **kwargs):
+                _sample_request(sample_rate)
+                start = time.perf_counter()
+                async for item in func(*args, **kwargs):
+                    yield item
+                log_duration(start)
+
+            return stream_wrapper
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start = time.time()
+            _sample_request(sample_rate)
+            start = time.perf_counter()
             result = await func(*args, **kwargs)
-            end = time.time()
-            logger.info(f"Function {func.__name__} took {end - start} seconds")
+            log_duration(start)
             return result
 
         return wrapper
@@ -0,0 +1,385 @@
+import asyncio
+import inspect
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+from logger import get_logger
+
+logger = get_logger()
+
+# Seconds, from tokenizing a short query to encoding a large request
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Seconds a scrape connection may stay open, so clients that connect and never
+# send a request do not hold it forever
+SCRAPE_TIMEOUT = 10.0
+
+_registry: list["_Metric"] = []
+# Called with no arguments whenever a tracked gRPC call finishes
+_request_listeners: list = []
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """A metric family with one value per combination of label values"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        labels = _format_labels(self.labelnames, key)
+        return [f"{self.name}{labels} {_format_value(value)}"]
+
+    def drain(self) -> dict:
+        """Take the values recorded so far, leaving the metric empty"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down. Unlabeled gauges can instead be read
+    from a function at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function) -> None:
+        self._function = function
+
+    def render(self) -> list[str]:
+        if self._function is not None:
+            self.set(self._function())
+        return super().render()
+
+    def merge(self, values: dict) -> None:
+        # Gauges describe the state of this process only
+        pass
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative `le` buckets, plus their sum"""
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _empty(self) -> list:
+        # Per-bucket counts (the last one is +Inf), then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = self._empty()
+            state[index] += 1
+            state[-1] += value
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, other in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = self._empty()
+                for i, value in enumerate(other):
+                    state[i] += value
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        names = self.labelnames + ("le",)
+        lines = []
+        count = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), value):
+            count += bucket_count
+            labels = _format_labels(names, key + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(value[-1])}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+REQUESTS = Counter(
+    "reranker_requests_total", "Handled gRPC calls", labelnames=("method",)
+)
+REQUEST_SECONDS = Histogram(
+    "reranker_request_duration_seconds",
+    "Wall time of gRPC calls",
+    labelnames=("method",),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "reranker_requests_in_flight", "gRPC calls currently being handled"
+)
+STAGE_SECONDS = Histogram(
+    "reranker_stage_duration_seconds",
+    "Time spent per request stage: queue_wait, tokenize, session_run, "
+    "normalize, score and response",
+    labelnames=("stage",),
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "reranker_executor_queue_depth",
+    "Tasks submitted to the inference pool that wait for a free worker",
+)
+EXECUTOR_TASKS = Gauge(
+    "reranker_executor_tasks", "Tasks submitted to the inference pool, not done"
+)
+REQUESTS_SHED = Counter(
+    "reranker_requests_shed_total",
+    "gRPC calls rejected by admission control instead of queued",
+    labelnames=("method",),
+)
+CANCELLED_TASKS = Counter(
+    "reranker_cancelled_tasks_total",
+    "Inference tasks of cancelled calls: dropped while queued, skipped before "
+    "being submitted, or left running",
+    labelnames=("state",),
+)
+QUEUED_TOKENS = Gauge(
+    "reranker_queued_tokens", "Estimated tokens of admitted calls that are not done"
+)
+DOCUMENTS_PER_REQUEST = Histogram(
+    "reranker_documents_per_request",
+    "Documents scored per call",
+    labelnames=("method",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+BATCH_TOKENS = Histogram(
+    "reranker_batch_tokens",
+    "Tokens per encoder batch, real or including padding",
+    labelnames=("kind",),
+    buckets=(16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536),
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "reranker_embedding_cache_lookups_total",
+    "Document embedding cache lookups, by hit or miss",
+    labelnames=("result",),
+)
+EMBEDDING_CACHE_EVICTIONS = Counter(
+    "reranker_embedding_cache_evictions_total",
+    "Document embeddings evicted from the cache to fit its memory budget",
+)
+
+
+def observe_stage(stage: str, started: float) -> None:
+    """Record the time since `started` (a perf_counter value) for a stage"""
+    STAGE_SECONDS.observe(perf_counter() - started, stage=stage)
+
+
+def drain() -> dict:
+    """Values recorded in this process since the last drain, by metric name.
+
+    Process pool workers return these with every task so the server process
+    can merge them into the metrics it exposes.
+    """
+    drained = {}
+    for metric in _registry:
+        values = metric.drain()
+        if values:
+            drained[metric.name] = values
+    return drained
+
+
+def merge(drained: dict) -> None:
+    """Add values drained in another process"""
+    for metric in _registry:
+        values = drained.get(metric.name)
+        if values:
+            metric.merge(values)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def add_request_listener(callback) -> None:
+    """Call `callback()` every time a call tracked by track_requests finishes"""
+    _request_listeners.append(callback)
+
+
+def _request_finished(method: str, started: float) -> None:
+    REQUESTS_IN_FLIGHT.dec()
+    REQUESTS.inc(method=method)
+    REQUEST_SECONDS.observe(perf_counter() - started, method=method)
+    for listener in _request_listeners:
+        listener()
+
+
+def track_requests(func):
+    """Count a gRPC method's calls, time them and track how many are in flight
+    (for streaming methods, until the stream is exhausted)"""
+    method = func.__name__
+
+    if inspect.isasyncgenfunction(func):
+
+        @wraps(func)
+        async def stream_wrapper(*args, **kwargs):
+            REQUESTS_IN_FLIGHT.inc()
+            started = perf_counter()
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+            finally:
+                _request_finished(method, started)
+
+        return stream_wrapper
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        REQUESTS_IN_FLIGHT.inc()
+        started = perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _request_finished(method, started)
+
+    return wrapper
+
+
+async def _scrape(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        request_line = await reader.readline()
+        # Skip the headers, the request has no body
+        while (await reader.readline()).strip():
+            pass
+        parts = request_line.decode("latin-1").split()
+        if (
+            len(parts) >= 2
+            and parts[0] == "GET"
+            and parts[1].split("?")[0]
+            in (
+                "/metrics",
+                "/",
+            )
+        ):
+            status = "200 OK"
+            body = render().encode()
+        else:
+            status = "404 Not Found"
+            body = b"Not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle_scrape(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        async with asyncio.timeout(SCRAPE_TIMEOUT):
+            await _scrape(reader, writer)
+    except TimeoutError:
+        # _scrape closed the connection when it was cancelled
+        logger.debug("Dropped a metrics connection after %ss", SCRAPE_TIMEOUT)
+
+
+async def start_metrics_server(port: int) -> asyncio.AbstractServer:
+    """Serve the metrics over HTTP on `port` (GET /metrics)"""
+    server = await asyncio.start_server(_handle_scrape, port=port)
+    logger.info("Serving metrics on port %d", port)
+    return server
@@ -39,6 +39,31 @@ class RerankServiceStub(object):
                 request_serializer=reranker__pb2.RerankRequest.SerializeToString,
                 response_deserializer=reranker__pb2.RerankResponse.FromString,
                 _registered_method=True)
+        self.IndexDocuments = channel.unary_unary(
+                '/reranker.RerankService/IndexDocuments',
+                request_serializer=reranker__pb2.IndexDocumentsRequest.SerializeToString,
+                response_deserializer=reranker__pb2.IndexDocumentsResponse.FromString,
+                _registered_method=True)
+        self.RerankByIds = channel.unary_unary(
+                '/reranker.RerankService/RerankByIds',
+                request_serializer=reranker__pb2.RerankByIdsRequest.SerializeToString,
+                response_deserializer=reranker__pb2.RerankResponse.FromString,
+                _registered_method=True)
+        self.RerankStream = channel.unary_stream(
+                '/reranker.RerankService/RerankStream',
+                request_serializer=reranker__pb2.RerankStreamRequest.SerializeToString,
+                response_deserializer=reranker__pb2.RerankStreamResponse.FromString,
+                _registered_method=True)
+        self.RerankBidiStream = channel.stream_stream(
+                '/reranker.RerankService/RerankBidiStream',
+                request_serializer=reranker__pb2.RerankStreamRequest.SerializeToString,
+                response_deserializer=reranker__pb2.RerankStreamResponse.FromString,
+                _registered_method=True)
+        self.RerankBatch = channel.unary_unary(
+                '/reranker.RerankService/RerankBatch',
+                request_serializer=reranker__pb2.RerankBatchRequest.SerializeToString,
+                response_deserializer=reranker__pb2.RerankBatchResponse.FromString,
+                _registered_method=True)
 
 
 class RerankServiceServicer(object):
@@ -50,6 +75,36 @@ class RerankServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def IndexDocuments(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RerankByIds(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RerankStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RerankBidiStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RerankBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_RerankServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +113,31 @@ def add_RerankServiceServicer_to_server(servicer, server):
                     request_deserializer=reranker__pb2.RerankRequest.FromString,
                     response_serializer=reranker__pb2.RerankResponse.SerializeToString,
             ),
+            'IndexDocuments': grpc.unary_unary_rpc_method_handler(
+                    servicer.IndexDocuments,
+                    request_deserializer=reranker__pb2.IndexDocumentsRequest.FromString,
+                    response_serializer=reranker__pb2.IndexDocumentsResponse.SerializeToString,
+            ),
+            'RerankByIds': grpc.unary_unary_rpc_method_handler(
+                    servicer.RerankByIds,
+                    request_deserializer=reranker__pb2.RerankByIdsRequest.FromString,
+                    response_serializer=reranker__pb2.RerankResponse.SerializeToString,
+            ),
+            'RerankStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.RerankStream,
+                    request_deserializer=reranker__pb2.RerankStreamRequest.FromString,
+                    response_serializer=reranker__pb2.RerankStreamResponse.SerializeToString,
+            ),
+            'RerankBidiStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.RerankBidiStream,
+                    request_deserializer=reranker__pb2.RerankStreamRequest.FromString,
+                    response_serializer=reranker__pb2.RerankStreamResponse.SerializeToString,
+            ),
+            'RerankBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.RerankBatch,
+                    request_deserializer=reranker__pb2.RerankBatchRequest.FromString,
+                    response_serializer=reranker__pb2.RerankBatchResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'reranker.RerankService', rpc_method_handlers)
@@ -95,3 +175,138 @@ class RerankService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def IndexDocuments(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/reranker.RerankService/IndexDocuments',
+            reranker__pb2.IndexDocumentsRequest.SerializeToString,
+            reranker__pb2.IndexDocumentsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RerankByIds(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/reranker.RerankService/RerankByIds',
+            reranker__pb2.RerankByIdsRequest.SerializeToString,
+            reranker__pb2.RerankResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RerankStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/reranker.RerankService/RerankStream',
+            reranker__pb2.RerankStreamRequest.SerializeToString,
+            reranker__pb2.RerankStreamResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RerankBidiStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/reranker.RerankService/RerankBidiStream',
+            reranker__pb2.RerankStreamRequest.SerializeToString,
+            reranker__pb2.RerankStreamResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RerankBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/reranker.RerankService/RerankBatch',
+            reranker__pb2.RerankBatchRequest.SerializeToString,
+            reranker__pb2.RerankBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
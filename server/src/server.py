@@ -1,87 +1,625 @@
 from __future__ import print_function
 
+import asyncio
+import heapq
 import os
+import signal
+from collections.abc import AsyncIterator
+from contextlib import AbstractContextManager, nullcontext
+from time import perf_counter
 
 from grpc import ServicerContext, StatusCode, aio
+from numpy import arange, argpartition, argsort, asarray, flatnonzero, float32
 from grpc_health.v1.health import HealthServicer
 from grpc_health.v1.health_pb2 import HealthCheckResponse
 from grpc_health.v1.health_pb2_grpc import add_HealthServicer_to_server
 
 from logger import get_logger, log_time
-from reranker_pb2 import RerankRequest, RerankResponse, RerankResult
+from metrics import (
+    DOCUMENTS_PER_REQUEST,
+    EXECUTOR_QUEUE_DEPTH,
+    EXECUTOR_TASKS,
+    QUEUED_TOKENS,
+    REQUESTS_SHED,
+    add_request_listener,
+    observe_stage,
+    start_metrics_server,
+    track_requests,
+)
+from reranker_pb2 import (
+    IndexDocumentsRequest,
+    IndexDocumentsResponse,
+    RerankBatchRequest,
+    RerankBatchResponse,
+    RerankByIdsRequest,
+    RerankRequest,
+    RerankResponse,
+    RerankResult,
+    RerankStreamRequest,
+    RerankStreamResponse,
+)
 from reranker_pb2_grpc import RerankServiceServicer, add_RerankServiceServicer_to_server
-from worker.inference import RerankerPool, create_pool, rerank
+from worker.admission import AdmissionController, OverloadedError
+from worker.inference import (
+    DEFAULT_MODEL,
+    RerankerPool,
+    create_pool,
+    index,
+    rerank,
+    rerank_batch,
+    rerank_by_ids,
+    rerank_stream,
+)
+from worker.profiling import Profiler
+from worker.scheduler import PRIORITY_DELAYS, request_priority
+from worker.store import DocumentNotFoundError
 
 logger = get_logger()
 
+# Request metadata that selects the priority class of a call
+PRIORITY_METADATA_KEY = "x-priority"
+
 
 class OnnxRerankerService(RerankServiceServicer):
-    def __init__(self, pool: RerankerPool):
+    def __init__(
+        self,
+        pool: RerankerPool,
+        stream_chunk_size: int = 32,
+        admission: AdmissionController | None = None,
+        rerank_chunk_size: int = 0,
+        max_stream_chunk_size: int = 1024,
+    ):
         super().__init__()
 
         self.pool = pool
+        self.admission = admission
         self.MAX_LEN_Q = 32
         self.MAX_LEN_D = 180
+        self.stream_chunk_size = stream_chunk_size
+        self.rerank_chunk_size = rerank_chunk_size
+        self.max_stream_chunk_size = max_stream_chunk_size
         logger.info("Service is ready!")
 
     @log_time(logger)
+    @track_requests
     async def Rerank(
         self, request: RerankRequest, context: ServicerContext
     ) -> RerankResponse:
+        self._set_priority(context)
         logger.info("Reranking %s documents", len(request.documents))
+        DOCUMENTS_PER_REQUEST.observe(len(request.documents), method="Rerank")
         query = request.query
         documents = list(request.documents)
 
         if not documents:
             return RerankResponse(results=[])
 
-        try:
-            final_scores = await rerank(
-                query, documents, self.MAX_LEN_Q, self.MAX_LEN_D, self.pool
+        if request.HasField("top_k") and request.top_k < 1:
+            context.set_details("top_k must be at least 1")
+            context.set_code(StatusCode.INVALID_ARGUMENT)
+            return RerankResponse()
+
+        model = self._resolve_model(request, context)
+        if model is None:
+            return RerankResponse()
+
+        ticket = self._admit(context, self._cost(1, len(documents)), "Rerank")
+        if ticket is None:
+            return RerankResponse()
+
+        with ticket:
+            try:
+                final_scores = await rerank(
+                    query,
+                    documents,
+                    self.MAX_LEN_Q,
+                    self.MAX_LEN_D,
+                    self.pool,
+                    model,
+                    self.rerank_chunk_size,
+                )
+                return_text = (
+                    request.return_text if request.HasField("return_text") else True
+                )
+                return self._build_response(
+                    final_scores,
+                    documents if return_text else None,
+                    request.top_k if request.HasField("top_k") else None,
+                    request.min_score if request.HasField("min_score") else None,
+                )
+
+            except Exception as e:
+                logger.error("Error: %s", e)
+                context.set_details(str(e))
+                context.set_code(StatusCode.INTERNAL)
+                return RerankResponse()
+
+    @log_time(logger)
+    @track_requests
+    async def RerankBatch(
+        self, request: RerankBatchRequest, context: ServicerContext
+    ) -> RerankBatchResponse:
+        self._set_priority(context)
+        logger.info(
+            "Reranking %s documents for %s queries",
+            len(request.documents),
+            len(request.queries),
+        )
+        DOCUMENTS_PER_REQUEST.observe(len(request.documents), method="RerankBatch")
+        queries = list(request.queries)
+        documents = list(request.documents)
+
+        if not queries or not documents:
+            return RerankBatchResponse(
+                responses=[RerankResponse(results=[]) for _ in queries]
             )
-            results = []
-            for i, score in enumerate(final_scores):
-                results.append(
+
+        if request.HasField("top_k") and request.top_k < 1:
+            context.set_details("top_k must be at least 1")
+            context.set_code(StatusCode.INVALID_ARGUMENT)
+            return RerankBatchResponse()
+
+        model = self._resolve_model(request, context)
+        if model is None:
+            return RerankBatchResponse()
+
+        ticket = self._admit(
+            context, self._cost(len(queries), len(documents)), "RerankBatch"
+        )
+        if ticket is None:
+            return RerankBatchResponse()
+
+        with ticket:
+            try:
+                scores = await rerank_batch(
+                    queries, documents, self.MAX_LEN_Q, self.MAX_LEN_D, self.pool, model
+                )
+                if request.score_matrix:
+                    return RerankBatchResponse(scores=scores.ravel().tolist())
+
+                return_text = (
+                    request.return_text if request.HasField("return_text") else True
+                )
+                return RerankBatchResponse(
+                    responses=[
+                        self._build_response(
+                            row,
+                            documents if return_text else None,
+                            request.top_k if request.HasField("top_k") else None,
+                            request.min_score
+                            if request.HasField("min_score")
+                            else None,
+                        )
+                        for row in scores
+                    ]
+                )
+
+            except Exception as e:
+                logger.error("Error: %s", e)
+                context.set_details(str(e))
+                context.set_code(StatusCode.INTERNAL)
+                return RerankBatchResponse()
+
+    @log_time(logger)
+    @track_requests
+    async def IndexDocuments(
+        self, request: IndexDocumentsRequest, context: ServicerContext
+    ) -> IndexDocumentsResponse:
+        self._set_priority(context)
+        logger.info("Indexing %s documents", len(request.documents))
+        if not self.pool.index_enabled:
+            context.set_details("Document index is disabled, set INDEX_PATH")
+            context.set_code(StatusCode.FAILED_PRECONDITION)
+            return IndexDocumentsResponse()
+
+        doc_ids = [document.id for document in request.documents]
+        documents = [document.text for document in request.documents]
+        if any(not doc_id for doc_id in doc_ids):
+            context.set_details("Document ids cannot be empty")
+            context.set_code(StatusCode.INVALID_ARGUMENT)
+            return IndexDocumentsResponse()
+
+        ticket = self._admit(context, self._cost(0, len(documents)), "IndexDocuments")
+        if ticket is None:
+            return IndexDocumentsResponse()
+
+        with ticket:
+            try:
+                indexed = await index(doc_ids, documents, self.MAX_LEN_D, self.pool)
+                return IndexDocumentsResponse(
+                    indexed=indexed, total_documents=self.pool.indexed_documents()
+                )
+
+            except Exception as e:
+                logger.error("Error: %s", e)
+                context.set_details(str(e))
+                context.set_code(StatusCode.INTERNAL)
+                return IndexDocumentsResponse()
+
+    @log_time(logger)
+    @track_requests
+    async def RerankByIds(
+        self, request: RerankByIdsRequest, context: ServicerContext
+    ) -> RerankResponse:
+        self._set_priority(context)
+        logger.info("Reranking %s indexed documents", len(request.document_ids))
+        DOCUMENTS_PER_REQUEST.observe(len(request.document_ids), method="RerankByIds")
+        if not self.pool.index_enabled:
+            context.set_details("Document index is disabled, set INDEX_PATH")
+            context.set_code(StatusCode.FAILED_PRECONDITION)
+            return RerankResponse()
+
+        doc_ids = list(request.document_ids)
+        if not doc_ids:
+            return RerankResponse(results=[])
+
+        if request.HasField("top_k") and request.top_k < 1:
+            context.set_details("top_k must be at least 1")
+            context.set_code(StatusCode.INVALID_ARGUMENT)
+            return RerankResponse()
+
+        ticket = self._admit(context, self._cost(1, len(doc_ids)), "RerankByIds")
+        if ticket is None:
+            return RerankResponse()
+
+        with ticket:
+            try:
+                final_scores = await rerank_by_ids(
+                    request.query, doc_ids, self.MAX_LEN_Q, self.pool
+                )
+                return self._build_response(
+                    final_scores,
+                    top_k=request.top_k if request.HasField("top_k") else None,
+                    min_score=request.min_score
+                    if request.HasField("min_score")
+                    else None,
+                )
+
+            except DocumentNotFoundError as e:
+                context.set_details(str(e))
+                context.set_code(StatusCode.NOT_FOUND)
+                return RerankResponse()
+
+            except Exception as e:
+                logger.error("Error: %s", e)
+                context.set_details(str(e))
+                context.set_code(StatusCode.INTERNAL)
+                return RerankResponse()
+
+    @log_time(logger)
+    @track_requests
+    async def RerankStream(
+        self, request: RerankStreamRequest, context: ServicerContext
+    ) -> AsyncIterator[RerankStreamResponse]:
+        self._set_priority(context)
+        logger.info("Streaming rerank of %s documents", len(request.documents))
+        documents = list(request.documents)
+        chunk_size = await self._stream_chunk_size(request.chunk_size, context)
+        model = self._resolve_model(request, context)
+        if model is None:
+            return
+
+        ticket = self._admit(context, self._cost(1, len(documents)), "RerankStream")
+        if ticket is None:
+            return
+
+        async def chunks():
+            for start in range(0, len(documents), chunk_size):
+                yield documents[start : start + chunk_size]
+
+        with ticket:
+            async for response in self._stream_results(
+                request.query, chunks(), request.top_k, model, context, "RerankStream"
+            ):
+                yield response
+
+    @log_time(logger)
+    @track_requests
+    async def RerankBidiStream(
+        self,
+        request_iterator: AsyncIterator[RerankStreamRequest],
+        context: ServicerContext,
+    ) -> AsyncIterator[RerankStreamResponse]:
+        self._set_priority(context)
+        first = None
+        async for request in request_iterator:
+            first = request
+            break
+        if first is None:
+            return
+
+        logger.info("Streaming rerank of incoming documents")
+        chunk_size = await self._stream_chunk_size(first.chunk_size, context)
+        model = self._resolve_model(first, context)
+        if model is None:
+            return
+
+        async def chunks():
+            # Regroup documents into chunk_size pieces regardless of how the
+            # client split them across messages
+            buffer = list(first.documents)
+            async for request in request_iterator:
+                buffer.extend(request.documents)
+                while len(buffer) >= chunk_size:
+                    yield buffer[:chunk_size]
+                    buffer = buffer[chunk_size:]
+            if buffer:
+                yield buffer
+
+        async for response in self._stream_results(
+            first.query, chunks(), first.top_k, model, context, "RerankBidiStream"
+        ):
+            yield response
+
+    async def _stream_results(
+        self,
+        query: str,
+        chunks: AsyncIterator[list[str]],
+        top_k: int,
+        model: str,
+        context: ServicerContext,
+        method: str,
+    ) -> AsyncIterator[RerankStreamResponse]:
+        """Score chunks as they arrive and emit partial or merged top-k results"""
+        texts: list[str] = []
+        best: list[tuple[float, int]] = []
+
+        async def collect():
+            # Keep the texts so results can echo them back
+            async for documents in chunks:
+                texts.extend(documents)
+                yield documents
+
+        try:
+            async for offset, scores in rerank_stream(
+                query, collect(), self.MAX_LEN_Q, self.MAX_LEN_D, self.pool, model
+            ):
+                if top_k > 0:
+                    for i, score in enumerate(scores):
+                        item = (float(score), offset + i)
+                        if len(best) < top_k:
+                            heapq.heappush(best, item)
+                        else:
+                            heapq.heappushpop(best, item)
+                    continue
+
+                results = [
                     RerankResult(
-                        original_index=i,
+                        original_index=offset + i,
                         score=float(score),
-                        text=documents[i],
+                        text=texts[offset + i],
                     )
-                )
+                    for i, score in enumerate(scores)
+                ]
+                results.sort(key=lambda x: x.score, reverse=True)
+                yield RerankStreamResponse(results=results)
 
-            results.sort(key=lambda x: x.score, reverse=True)
-
-            return RerankResponse(results=results)
+            final_results = [
+                RerankResult(original_index=position, score=score, text=texts[position])
+                for score, position in sorted(best, reverse=True)
+            ]
+            yield RerankStreamResponse(results=final_results, final=True)
+            DOCUMENTS_PER_REQUEST.observe(len(texts), method=method)
 
         except Exception as e:
             logger.error("Error: %s", e)
             context.set_details(str(e))
             context.set_code(StatusCode.INTERNAL)
-            return RerankResponse()
+
+    async def _stream_chunk_size(self, requested: int, context: ServicerContext) -> int:
+        """Documents per chunk for a streaming call: the server default when the
+        request leaves chunk_size at 0, at most max_stream_chunk_size"""
+        if requested < 0:
+            await context.abort(
+                StatusCode.INVALID_ARGUMENT, "chunk_size must not be negative"
+            )
+        return min(requested or self.stream_chunk_size, self.max_stream_chunk_size)
+
+    @staticmethod
+    def _set_priority(context: ServicerContext) -> None:
+        """Schedule the call's inference with the priority class it asks for in
+        its x-priority metadata (high, normal or low)"""
+        for key, value in context.invocation_metadata() or ():
+            if key == PRIORITY_METADATA_KEY:
+                if value in PRIORITY_DELAYS:
+                    request_priority.set(value)
+                else:
+                    logger.warning("Ignoring unknown priority %r", value)
+
+    def _cost(self, queries: int, documents: int) -> int:
+        """Estimated cost of a call in tokens, for admission control"""
+        return queries * self.MAX_LEN_Q + documents * self.MAX_LEN_D
+
+    def _admit(
+        self, context: ServicerContext, tokens: int, method: str
+    ) -> AbstractContextManager | None:
+        """Admission ticket to hold while a call runs, None after failing the
+        call with RESOURCE_EXHAUSTED if it is shed"""
+        if self.admission is None:
+            return nullcontext()
+        try:
+            return self.admission.admit(tokens, context.time_remaining())
+        except OverloadedError as e:
+            REQUESTS_SHED.inc(method=method)
+            logger.warning("Shedding %s call: %s", method, e)
+            context.set_details(str(e))
+            context.set_code(StatusCode.RESOURCE_EXHAUSTED)
+            return None
+
+    def _resolve_model(self, request, context: ServicerContext) -> str | None:
+        """Model variant a request asks for, None after failing the call if the
+        variant is not loaded"""
+        try:
+            return self.pool.resolve_model(
+                request.model if request.HasField("model") else None
+            )
+        except ValueError as e:
+            context.set_details(str(e))
+            context.set_code(StatusCode.INVALID_ARGUMENT)
+            return None
+
+    @staticmethod
+    def _build_response(
+        scores,
+        documents: list[str] | None = None,
+        top_k: int | None = None,
+        min_score: float | None = None,
+    ) -> RerankResponse:
+        """Select, sort and serialize the results that are actually returned"""
+        started = perf_counter()
+        scores = asarray(scores, dtype=float32)
+        selected = arange(len(scores))
+        if min_score is not None:
+            selected = flatnonzero(scores >= min_score)
+        if top_k is not None and top_k < len(selected):
+            # Partial sort: only the k best are fully ordered below
+            best = argpartition(-scores[selected], top_k - 1)[:top_k]
+            selected = selected[best]
+            selected.sort()
+        order = selected[argsort(-scores[selected], kind="stable")]
+
+        results = [
+            RerankResult(
+                original_index=i,
+                score=score,
+                text=documents[i] if documents is not None else "",
+            )
+            for i, score in zip(order.tolist(), scores[order].tolist())
+        ]
+
+        response = RerankResponse(results=results)
+        observe_stage("response", started)
+        return response
+
+
+def parse_model_variants(spec: str) -> dict[str, str]:
+    """Parse MODEL_VARIANTS, e.g. "fp32=model/onnx_full/model.onnx,int8=..." """
+    models = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, sep, path = item.partition("=")
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f"Invalid model variant {item!r}, expected name=path")
+        models[name.strip()] = path.strip()
+    return models
 
 
 async def serve():
     pool_size = int(os.getenv("POOL_SIZE", "1"))
     model_path = os.getenv("MODEL_PATH", "model/onnx_full/model.onnx")
+    models = parse_model_variants(os.getenv("MODEL_VARIANTS", "")) or {
+        DEFAULT_MODEL: model_path
+    }
+    default_model = os.getenv("MODEL_VARIANT", "")
     tokenizer_path = os.getenv("TOKENIZER_PATH", "model/onnx_full/tokenizer.json")
-    pool = create_pool(model_path, tokenizer_path, pool_size)
+    cache_mb = int(os.getenv("EMBEDDING_CACHE_MB", "256"))
+    dynamic_batching = os.getenv("DYNAMIC_BATCHING", "false").lower() == "true"
+    batch_max_tokens = int(os.getenv("BATCH_MAX_TOKENS", "16384"))
+    batch_max_wait_us = int(os.getenv("BATCH_MAX_WAIT_US", "2000"))
+    index_path = os.getenv("INDEX_PATH", "")
+    index_dtype = os.getenv("INDEX_DTYPE", "float16")
+    stream_chunk_size = int(os.getenv("STREAM_CHUNK_SIZE", "32"))
+    max_stream_chunk_size = int(os.getenv("MAX_STREAM_CHUNK_SIZE", "1024"))
+    if not 0 < stream_chunk_size <= max_stream_chunk_size:
+        raise ValueError(
+            "STREAM_CHUNK_SIZE must be between 1 and MAX_STREAM_CHUNK_SIZE"
+        )
+    rerank_chunk_size = int(os.getenv("RERANK_CHUNK_SIZE", "256"))
+    scheduler = os.getenv("SCHEDULER", "fair").lower()
+    scheduler_aging_rate = float(os.getenv("SCHEDULER_AGING_TOKENS_PER_S", "20000"))
+    if scheduler not in ("fair", "fifo"):
+        raise ValueError(f"Unknown scheduler {scheduler!r}, expected fair or fifo")
+    pool_mode = os.getenv("POOL_MODE", "thread").lower()
+    scoring_chunk_tokens = int(os.getenv("SCORING_CHUNK_TOKENS", "4096"))
+    metrics_port = int(os.getenv("METRICS_PORT", "9464"))
+    admission_control = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+    max_queued_tokens = int(os.getenv("MAX_QUEUED_TOKENS", "0"))
+    deadline_headroom = float(os.getenv("ADMISSION_DEADLINE_HEADROOM", "1.0"))
+    profile_dir = os.getenv("PROFILE_DIR", "profiles")
+    profile_requests = int(os.getenv("PROFILE_REQUESTS", "100"))
+    profile_seconds = float(os.getenv("PROFILE_SECONDS", "30"))
+    profile_sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+    pool = create_pool(
+        models,
+        tokenizer_path,
+        pool_size,
+        cache_max_bytes=cache_mb * 1024 * 1024,
+        batch_max_tokens=batch_max_tokens if dynamic_batching else 0,
+        batch_max_wait_us=batch_max_wait_us,
+        index_path=index_path,
+        index_dtype=index_dtype,
+        default_model=default_model,
+        scoring_chunk_tokens=scoring_chunk_tokens,
+        profile_dir=profile_dir,
+        profile_sample_interval=profile_sample_interval,
+        scheduler_aging_rate=scheduler_aging_rate if scheduler == "fair" else 0.0,
+        mode=pool_mode,
+    )
+    EXECUTOR_TASKS.set_function(lambda: pool.outstanding)
+    EXECUTOR_QUEUE_DEPTH.set_function(lambda: max(0, pool.outstanding - pool.pool_size))
+
+    admission = None
+    if admission_control:
+        admission = AdmissionController(pool_size, max_queued_tokens, deadline_headroom)
+        QUEUED_TOKENS.set_function(lambda: admission.queued_tokens)
+
+    # SIGUSR1 profiles the next PROFILE_REQUESTS calls or PROFILE_SECONDS
+    # seconds, SIGUSR2 ends the session early
+    profiler = Profiler(
+        pool,
+        profile_dir,
+        requests=profile_requests,
+        seconds=profile_seconds,
+        sample_interval=profile_sample_interval,
+    )
+    add_request_listener(profiler.request_finished)
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGUSR1, profiler.start)
+    loop.add_signal_handler(signal.SIGUSR2, profiler.stop)
 
     server_port = int(os.getenv("SERVER_PORT", "50051"))
-    server = aio.server()
+    # Clients keep their channels open and ping them while idle
+    server = aio.server(
+        options=[
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.min_ping_interval_without_data_ms", 10000),
+        ]
+    )
     logger.info("Starting server on port %s", server_port)
-    logger.info("Model path: %s", model_path)
+    logger.info("Models: %s", ", ".join(f"{k}={v}" for k, v in models.items()))
     logger.info("Tokenizer path: %s", tokenizer_path)
-    logger.info("Pool size: %s", pool_size)
-    add_RerankServiceServicer_to_server(OnnxRerankerService(pool), server)
+    logger.info("Pool size: %s (%s mode)", pool_size, pool_mode)
+    logger.info("Scheduler: %s", scheduler)
+    logger.info("Embedding cache: %s MB", cache_mb)
+    logger.info("Document index: %s", index_path or "disabled")
+    logger.info(
+        "Admission control: %s",
+        (
+            f"max {max_queued_tokens or 'unlimited'} queued tokens"
+            if admission_control
+            else "disabled"
+        ),
+    )
+    add_RerankServiceServicer_to_server(
+        OnnxRerankerService(
+            pool,
+            stream_chunk_size,
+            admission,
+            rerank_chunk_size,
+            max_stream_chunk_size,
+        ),
+        server,
+    )
     health_servicer = HealthServicer()
     health_servicer.set("", HealthCheckResponse.ServingStatus.SERVING)
     add_HealthServicer_to_server(health_servicer, server)
     server.add_insecure_port(f"[::]:{server_port}")
     await server.start()
+    if metrics_port > 0:
+        await start_metrics_server(metrics_port)
     await server.wait_for_termination()
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(serve())
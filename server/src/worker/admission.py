@@ -0,0 +1,102 @@
+from time import monotonic
+
+from logger import get_logger
+
+logger = get_logger()
+
+# Weight of a new sample in the seconds-per-token estimate
+EWMA_ALPHA = 0.2
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed instead of queued"""
+
+
+class Ticket:
+    """Tokens of an admitted request, held until the request finishes"""
+
+    def __init__(self, controller: "AdmissionController", tokens: int, ahead: int):
+        self.controller = controller
+        self.tokens = tokens
+        self.ahead = ahead
+        self.admitted_at = monotonic()
+        self._released = False
+
+    def release(self, completed: bool = True) -> None:
+        if not self._released:
+            self._released = True
+            self.controller._release(self, completed)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release(completed=exc_type is None)
+
+
+class AdmissionController:
+    """Sheds requests that cannot finish before their deadline.
+
+    Every admitted request holds its estimated cost in tokens (documents x
+    tokens per document, plus its queries) until it finishes. A request's
+    expected completion time is the queued work ahead of it spread over the
+    `workers`, plus its own cost, times a seconds-per-token rate learned from
+    finished requests. Requests whose deadline is closer than that, or that
+    would push the queued tokens past `max_queued_tokens`, are rejected with
+    OverloadedError before any work is done. Until the first request finishes
+    the rate is unknown and only the token cap applies.
+
+    Runs on the event loop only, so it needs no locking.
+    """
+
+    def __init__(self, workers: int, max_queued_tokens: int = 0, headroom: float = 1.0):
+        self.workers = max(1, workers)
+        self.max_queued_tokens = max_queued_tokens
+        self.headroom = headroom
+        self.queued_tokens = 0
+        self.seconds_per_token = 0.0
+
+    def expected_seconds(self, tokens: int) -> float:
+        """Expected time until a request of `tokens` admitted now finishes"""
+        return self.seconds_per_token * (self.queued_tokens / self.workers + tokens)
+
+    def admit(self, tokens: int, time_remaining: float | None = None) -> Ticket:
+        """Reserve `tokens` for a request, OverloadedError if it should be shed.
+
+        `time_remaining` is the request's remaining deadline in seconds, None
+        when the client did not set one.
+        """
+        # A request larger than the cap still runs when nothing else is queued
+        if (
+            self.max_queued_tokens > 0
+            and self.queued_tokens > 0
+            and self.queued_tokens + tokens > self.max_queued_tokens
+        ):
+            raise OverloadedError(
+                f"Server overloaded: {self.queued_tokens} tokens queued, "
+                f"limit is {self.max_queued_tokens}"
+            )
+
+        if time_remaining is not None:
+            expected = self.expected_seconds(tokens) * self.headroom
+            if expected > time_remaining:
+                raise OverloadedError(
+                    f"Request cannot finish before its deadline: expected "
+                    f"{expected:.3f}s, {max(time_remaining, 0.0):.3f}s remaining"
+                )
+
+        ticket = Ticket(self, tokens, self.queued_tokens)
+        self.queued_tokens += tokens
+        return ticket
+
+    def _release(self, ticket: Ticket, completed: bool) -> None:
+        self.queued_tokens -= ticket.tokens
+        if not completed or ticket.tokens <= 0:
+            # Failed and cancelled requests say nothing about throughput
+            return
+        work = ticket.ahead / self.workers + ticket.tokens
+        sample = (monotonic() - ticket.admitted_at) / work
+        if self.seconds_per_token == 0.0:
+            self.seconds_per_token = sample
+        else:
+            self.seconds_per_token += EWMA_ALPHA * (sample - self.seconds_per_token)
@@ -0,0 +1,198 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from numpy import ndarray
+
+from logger import get_logger
+from metrics import CANCELLED_TASKS
+from worker.scheduler import PRIORITY_DELAYS, request_priority
+
+logger = get_logger()
+
+
+@dataclass
+class _PendingRequest:
+    query: str
+    documents: list[str]
+    max_len_q: int
+    max_len_d: int
+    model: str
+    future: asyncio.Future
+    enqueued_at: float
+    priority: str
+    tokens: int = field(init=False)
+
+    def __post_init__(self):
+        self.tokens = len(self.documents) * self.max_len_d
+
+    @property
+    def shape_key(self) -> tuple[int, int, str]:
+        return self.max_len_q, self.max_len_d, self.model
+
+
+class DynamicBatcher:
+    """Merges concurrent rerank requests into shared inference batches.
+
+    Only requests for the same lengths and model variant share a batch. A
+    batch is dispatched once it reaches `max_batch_tokens` or once its oldest
+    request has waited `max_wait_us` microseconds, whichever comes first. At most
+    `max_concurrency` batches run at a time so requests keep accumulating here
+    instead of queueing behind each other in the executor.
+
+    `run` is the pool's coroutine function that executes `batch_func` on a
+    worker.
+    """
+
+    def __init__(
+        self,
+        run,
+        batch_func,
+        max_concurrency: int,
+        max_batch_tokens: int,
+        max_wait_us: int,
+    ):
+        self.run = run
+        self.batch_func = batch_func
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait = max_wait_us / 1_000_000
+
+        self._pending: list[_PendingRequest] = []
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(
+        self,
+        query: str,
+        documents: list[str],
+        max_len_q: int,
+        max_len_d: int,
+        model: str,
+    ) -> ndarray:
+        """Queue a request and wait for its scores"""
+        self._ensure_started()
+        assert self._wakeup is not None
+
+        loop = asyncio.get_running_loop()
+        request = _PendingRequest(
+            query=query,
+            documents=documents,
+            max_len_q=max_len_q,
+            max_len_d=max_len_d,
+            model=model,
+            future=loop.create_future(),
+            enqueued_at=loop.time(),
+            priority=request_priority.get(),
+        )
+        self._pending.append(request)
+        self._wakeup.set()
+        return await request.future
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def _pending_tokens(self, shape_key: tuple[int, int, str]) -> int:
+        return sum(r.tokens for r in self._pending if r.shape_key == shape_key)
+
+    def _take_batch(self) -> list[_PendingRequest]:
+        """Pop the oldest request plus compatible ones up to the token budget"""
+        shape_key = self._pending[0].shape_key
+        batch, remaining = [], []
+        tokens = 0
+        for request in self._pending:
+            if request.future.done():
+                # The caller went away while queued
+                CANCELLED_TASKS.inc(state="queued")
+                continue
+            fits = not batch or tokens + request.tokens <= self.max_batch_tokens
+            if request.shape_key == shape_key and fits:
+                batch.append(request)
+                tokens += request.tokens
+            else:
+                remaining.append(request)
+        self._pending = remaining
+        return batch
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None and self._slots is not None
+        loop = asyncio.get_running_loop()
+
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            await self._slots.acquire()
+
+            # Give concurrent requests a chance to join, bounded by how long
+            # the oldest one has already been waiting
+            shape_key = self._pending[0].shape_key
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while self._pending_tokens(shape_key) < self.max_batch_tokens:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except TimeoutError:
+                    break
+
+            batch = self._take_batch()
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+            for request in batch:
+                request.future.add_done_callback(
+                    lambda _, task=task, batch=batch: self._abandon(task, batch)
+                )
+
+    @staticmethod
+    def _abandon(task: asyncio.Task, batch: list[_PendingRequest]) -> None:
+        """Cancel a batch once every caller waiting for it went away"""
+        if not task.done() and all(r.future.cancelled() for r in batch):
+            task.cancel()
+
+    async def _dispatch(self, batch: list[_PendingRequest]) -> None:
+        assert self._slots is not None
+        max_len_q, max_len_d, model = batch[0].shape_key
+        # The batch runs as soon as its most urgent request would
+        priority = min(
+            (r.priority for r in batch),
+            key=lambda p: PRIORITY_DELAYS.get(p, float("inf")),
+        )
+        try:
+            results = await self.run(
+                self.batch_func,
+                [(r.query, r.documents) for r in batch],
+                max_len_q,
+                max_len_d,
+                model,
+                cost=sum(max_len_q + r.tokens for r in batch),
+                priority=priority,
+            )
+            for request, scores in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(scores)
+        except Exception as e:
+            logger.error("Error running batch of %d requests: %s", len(batch), e)
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            self._slots.release()
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+
+from numpy import ndarray
+
+from logger import get_logger
+from metrics import EMBEDDING_CACHE_EVICTIONS, EMBEDDING_CACHE_LOOKUPS
+
+logger = get_logger()
+
+
+def document_key(model_id: str, max_len_d: int, text: str) -> bytes:
+    """Content-addressed key for a document embedding."""
+    digest = blake2b(digest_size=16)
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(str(max_len_d).encode("ascii"))
+    digest.update(b"\x00")
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of normalized document embeddings with a byte budget"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[bytes, ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> ndarray | None:
+        """Return the cached embedding for key, marking it as recently used"""
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                EMBEDDING_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            EMBEDDING_CACHE_LOOKUPS.inc(result="hit")
+            return embedding
+
+    def put(self, key: bytes, embedding: ndarray) -> None:
+        """Store an embedding, evicting least recently used entries to fit"""
+        size = embedding.nbytes
+        if size > self.max_bytes:
+            return
+
+        # Detach from the batch tensor so evicted batches can be freed
+        embedding = embedding.copy()
+        embedding.flags.writeable = False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+                EMBEDDING_CACHE_EVICTIONS.inc()
+
+            self._entries[key] = embedding
+            self.current_bytes += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,39 +1,276 @@
 import asyncio
+import itertools
+import multiprocessing
 import os
+import threading
+from collections.abc import AsyncIterator
 from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from time import monotonic, perf_counter
 
 import onnxruntime as ort
-from numpy import array, clip, int64, linalg, matmul, ndarray, transpose
-from numpy import max as np_max
-from numpy import sum as np_sum
+from numpy import (
+    arange,
+    array,
+    clip,
+    concatenate,
+    fromiter,
+    int64,
+    linalg,
+    maximum,
+    ndarray,
+    zeros,
+)
 from tokenizers import Tokenizer
 
 from logger import get_logger
-
-_session = None
+from metrics import BATCH_TOKENS, CANCELLED_TASKS, STAGE_SECONDS, observe_stage
+from worker.batcher import DynamicBatcher
+from worker.cache import EmbeddingCache, document_key
+from worker.profiling import (
+    DEFAULT_SAMPLE_INTERVAL,
+    StackSampler,
+    session_directory,
+    write_trace,
+)
+from worker.scheduler import FairScheduler
+from worker.scoring import DEFAULT_CHUNK_TOKENS, maxsim
+from worker.store import EmbeddingStore
+
+# Every pool worker (thread or process) owns its ORT session, tokenizers and
+# encoding buffers
+_worker = threading.local()
+# Loaded once, copied into each worker's tokenizers
 _tokenizer = None
+_embedding_cache = None
+_scoring_chunk_tokens = DEFAULT_CHUNK_TOKENS
+# Id of the running profiling session shared by the pool (0 when off), and the
+# barrier that makes every worker apply it at once
+_profiling_state = None
+_profiling_barrier = None
+_profile_dir = ""
+_profile_sample_interval = DEFAULT_SAMPLE_INTERVAL
+# Whether workers sample their own Python stacks (process mode); threads are
+# covered by the server process' sampler
+_profile_worker_stacks = False
+
+# Variant name used when only MODEL_PATH is configured
+DEFAULT_MODEL = "default"
+
+# Documents encoded per session.run call while indexing
+INDEX_BATCH_SIZE = 64
+
+# Sequences are padded up to the nearest bucket (capped at the max length) so
+# short documents skip most of the attention cost while ORT still sees a small,
+# stable set of input shapes
+PADDING_BUCKETS = (16, 32, 64, 96, 128)
 
 
 logger = get_logger()
 
 
-def start_session(model_path: str) -> None:
-    global _session
-    sess_options = ort.SessionOptions()
-    ort_single_threaded = os.environ.get("ORT_SINGLE_THREADED", "false") == "true"
-    if ort_single_threaded:
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def available_cores() -> list[int]:
+    """CPU ids this process may run on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def session_options(worker_index: int = 0, workers: int = 1) -> ort.SessionOptions:
+    """Build the ORT session options of one pool worker from the environment.
+
+    Without explicit thread counts the available cores are split evenly
+    between the workers, so POOL_SIZE sessions do not each start a thread per
+    core. With ORT_PIN_THREADS=true worker `worker_index` is also pinned to its
+    own slice of cores.
+    """
+    cores = available_cores()
+    intra_op_threads = int(
+        os.environ.get("ORT_INTRA_OP_THREADS", max(1, len(cores) // workers))
+    )
+    inter_op_threads = int(os.environ.get("ORT_INTER_OP_THREADS", "1"))
+    if os.environ.get("ORT_SINGLE_THREADED", "false") == "true":
         logger.info("Using single-threaded ONNXRuntime")
-        sess_options.intra_op_num_threads = 1
-        sess_options.inter_op_num_threads = 1
-        sess_options.graph_optimization_level = (
-            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        intra_op_threads = inter_op_threads = 1
+
+    optimization_level = os.environ.get("ORT_GRAPH_OPTIMIZATION_LEVEL", "all")
+    execution_mode = os.environ.get("ORT_EXECUTION_MODE", "sequential")
+    if optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(
+            f"Unknown ORT_GRAPH_OPTIMIZATION_LEVEL {optimization_level!r}, "
+            f"expected one of {', '.join(GRAPH_OPTIMIZATION_LEVELS)}"
+        )
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(
+            f"Unknown ORT_EXECUTION_MODE {execution_mode!r}, "
+            f"expected one of {', '.join(EXECUTION_MODES)}"
         )
 
-    _session = ort.InferenceSession(
-        model_path,
-        sess_options=ort.SessionOptions(),
-        providers=["CPUExecutionProvider"],
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = intra_op_threads
+    sess_options.inter_op_num_threads = inter_op_threads
+    sess_options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+        optimization_level
+    ]
+    sess_options.execution_mode = EXECUTION_MODES[execution_mode]
+    sess_options.enable_cpu_mem_arena = (
+        os.environ.get("ORT_ENABLE_CPU_MEM_ARENA", "true") == "true"
+    )
+    if os.environ.get("ORT_ALLOW_SPINNING", "true") != "true":
+        # Idle intra-op threads sleep instead of busy-waiting for work
+        sess_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+    slice_start = worker_index * intra_op_threads
+    worker_cores = cores[slice_start : slice_start + intra_op_threads]
+    pin_threads = os.environ.get("ORT_PIN_THREADS", "false") == "true"
+    if pin_threads and len(worker_cores) == intra_op_threads:
+        # The calling thread is intra-op thread 0, ORT only places the others.
+        # Affinities are 1-based logical processor ids.
+        os.sched_setaffinity(0, worker_cores[:1])
+        if intra_op_threads > 1:
+            sess_options.add_session_config_entry(
+                "session.intra_op_thread_affinities",
+                ";".join(str(core + 1) for core in worker_cores[1:]),
+            )
+    elif pin_threads:
+        logger.warning(
+            "Not enough cores to pin worker %d to %d cores",
+            worker_index,
+            intra_op_threads,
+        )
+
+    logger.info(
+        "Worker %d: %d intra-op / %d inter-op threads, %s optimization, %s execution",
+        worker_index,
+        intra_op_threads,
+        inter_op_threads,
+        optimization_level,
+        execution_mode,
     )
+    return sess_options
+
+
+def start_session(
+    models: dict[str, str], worker_index: int = 0, workers: int = 1
+) -> None:
+    """Create the ORT sessions of the calling worker, one per model variant"""
+    _worker.models = models
+    _worker.index = worker_index
+    _worker.workers = workers
+    sess_options = session_options(worker_index, workers)
+    _worker.sessions = {
+        name: ort.InferenceSession(
+            model_path,
+            sess_options=sess_options,
+            providers=["CPUExecutionProvider"],
+        )
+        for name, model_path in models.items()
+    }
+
+
+def _start_worker_thread(models: dict[str, str], worker_ids, workers: int) -> None:
+    """Thread pool initializer, loads the sessions of each worker thread"""
+    start_session(models, next(worker_ids), workers)
+
+
+def run_task(submitted_at: float, func, *args):
+    """Run a pool task, recording how long it waited for a free worker.
+
+    `submitted_at` is a monotonic() value, which is comparable between
+    processes unlike perf_counter().
+    """
+    STAGE_SECONDS.observe(monotonic() - submitted_at, stage="queue_wait")
+    if _profiling_state is not None and _profiling_state.value != getattr(
+        _worker, "profile_id", 0
+    ):
+        sync_profiling()
+    return func(*args)
+
+
+def start_profiling(
+    state, barrier, directory: str, sample_interval: float, worker_stacks: bool
+) -> None:
+    global _profiling_state, _profiling_barrier, _profile_dir
+    global _profile_sample_interval, _profile_worker_stacks
+    _profiling_state = state
+    _profiling_barrier = barrier
+    _profile_dir = directory
+    _profile_sample_interval = sample_interval
+    _profile_worker_stacks = worker_stacks
+
+
+def _start_worker_profiling(session_id: int) -> None:
+    """Swap the calling worker's sessions for ones with ORT profiling enabled"""
+    directory = session_directory(_profile_dir, session_id)
+    sess_options = session_options(_worker.index, _worker.workers)
+    sess_options.enable_profiling = True
+    sess_options.profile_file_prefix = os.path.join(
+        directory, f"ort-{os.getpid()}-{_worker.index}"
+    )
+    _worker.idle_sessions = _worker.sessions
+    _worker.sessions = {
+        name: ort.InferenceSession(
+            model_path,
+            sess_options=sess_options,
+            providers=["CPUExecutionProvider"],
+        )
+        for name, model_path in _worker.models.items()
+    }
+    if _profile_worker_stacks:
+        _worker.sampler = StackSampler(_profile_sample_interval)
+        _worker.sampler.start()
+
+
+def _stop_worker_profiling(session_id: int) -> None:
+    """Write the calling worker's traces and restore its normal sessions"""
+    directory = session_directory(_profile_dir, session_id)
+    idle_sessions = _worker.__dict__.pop("idle_sessions", None)
+    if idle_sessions is not None:
+        for session in _worker.sessions.values():
+            session.end_profiling()
+        _worker.sessions = idle_sessions
+    sampler = _worker.__dict__.pop("sampler", None)
+    if sampler is not None:
+        write_trace(
+            os.path.join(directory, f"python-{os.getpid()}.json"), sampler.stop()
+        )
+
+
+def sync_profiling() -> None:
+    """Start or stop profiling on the calling worker to match the pool"""
+    assert _profiling_state is not None
+    session_id = _profiling_state.value
+    current = getattr(_worker, "profile_id", 0)
+    # Set first, a failure is logged once instead of on every task
+    _worker.profile_id = session_id
+    try:
+        if current:
+            _stop_worker_profiling(current)
+        if session_id:
+            _start_worker_profiling(session_id)
+    except Exception as e:
+        logger.error("Error switching worker %d profiling: %s", _worker.index, e)
+
+
+def sync_worker() -> None:
+    """Apply the profiling state, then wait until every worker has"""
+    assert _profiling_barrier is not None
+    sync_profiling()
+    _profiling_barrier.wait()
 
 
 def start_tokenizer(tokenizer_path: str) -> None:
@@ -41,24 +278,259 @@ def start_tokenizer(tokenizer_path: str) -> None:
     _tokenizer = Tokenizer.from_file(tokenizer_path)
 
 
-class RerankerPool:
-    """Thread-based inference pool that works better with asyncio"""
+def _worker_tokenizer(max_length: int) -> Tokenizer:
+    """Tokenizer of the calling worker that truncates to max_length.
+
+    Each worker configures one tokenizer per length (in practice one for
+    queries and one for documents) the first time it is used, instead of
+    reconfiguring a shared tokenizer on every call.
+    """
+    tokenizers = _worker.__dict__.setdefault("tokenizers", {})
+    tokenizer = tokenizers.get(max_length)
+    if tokenizer is None:
+        assert _tokenizer is not None
+        tokenizer = Tokenizer.from_str(_tokenizer.to_str())
+        tokenizer.enable_truncation(max_length=max_length)
+        tokenizer.no_padding()
+        tokenizers[max_length] = tokenizer
+    return tokenizer
+
+
+def _worker_buffer(name: str, rows: int, max_length: int) -> ndarray:
+    """Zeroed (rows, max_length) int64 buffer of the calling worker.
+
+    Buffers only grow, so steady-state encoding does not allocate.
+    """
+    buffers = _worker.__dict__.setdefault("buffers", {})
+    buffer = buffers.get((name, max_length))
+    if buffer is None or len(buffer) < rows:
+        capacity = rows if buffer is None else max(rows, 2 * len(buffer))
+        buffer = zeros((capacity, max_length), dtype=int64)
+        buffers[(name, max_length)] = buffer
+    view = buffer[:rows]
+    view.fill(0)
+    return view
+
+
+def tokenize(text_list, max_length) -> tuple[ndarray, ndarray, ndarray]:
+    """Tokenize into zero-padded (n, max_length) input id and token type
+    buffers, plus the token count of each text"""
+    encodings = _worker_tokenizer(max_length).encode_batch(text_list)
+    lengths = fromiter(
+        (len(e.ids) for e in encodings), dtype=int64, count=len(encodings)
+    )
+    total = int(lengths.sum())
+
+    # Boolean assignment fills row by row, matching the concatenated order
+    filled = arange(max_length) < lengths[:, None]
+    input_ids = _worker_buffer("input_ids", len(encodings), max_length)
+    token_type_ids = _worker_buffer("token_type_ids", len(encodings), max_length)
+    input_ids[filled] = fromiter(
+        chain.from_iterable(e.ids for e in encodings), dtype=int64, count=total
+    )
+    token_type_ids[filled] = fromiter(
+        chain.from_iterable(e.type_ids for e in encodings), dtype=int64, count=total
+    )
+    return input_ids, token_type_ids, lengths
+
+
+def start_embedding_cache(max_bytes: int) -> None:
+    global _embedding_cache
+    if max_bytes <= 0:
+        _embedding_cache = None
+        return
+    logger.info("Using document embedding cache (%d MB)", max_bytes // (1024 * 1024))
+    _embedding_cache = EmbeddingCache(max_bytes)
+
+
+def start_scoring(chunk_tokens: int) -> None:
+    global _scoring_chunk_tokens
+    _scoring_chunk_tokens = chunk_tokens
 
-    def __init__(self, model_path: str, tokenizer_path: str, pool_size: int = 1):
+
+class RerankerPool:
+    """Thread-based inference pool that works better with asyncio.
+
+    `models` maps variant names (e.g. fp32, int8) to ONNX model paths. Every
+    worker loads all variants; requests pick one by name and otherwise use
+    `default_model`, the first variant unless set. The document index is
+    always built and queried with the default variant.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, str],
+        tokenizer_path: str,
+        pool_size: int = 1,
+        cache_max_bytes: int = 0,
+        batch_max_tokens: int = 0,
+        batch_max_wait_us: int = 0,
+        index_path: str = "",
+        index_dtype: str = "float16",
+        default_model: str = "",
+        scoring_chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        profile_dir: str = "profiles",
+        profile_sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+        scheduler_aging_rate: float = 0.0,
+    ):
+        if not models:
+            raise ValueError("At least one model variant is required")
+        default_model = default_model or next(iter(models))
+        if default_model not in models:
+            raise ValueError(
+                f"Unknown default model {default_model!r}, expected one of "
+                f"{', '.join(models)}"
+            )
+
+        self.models = models
+        self.default_model = default_model
         self.pool_size = pool_size
-        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.profile_dir = profile_dir
+        self.profile_sample_interval = profile_sample_interval
+        # Tasks submitted through run() that have not finished yet
+        self.outstanding = 0
+        # Decides which waiting task gets the next free worker
+        self.scheduler = FairScheduler(pool_size, scheduler_aging_rate)
+        self.batcher = None
+        self.store = None
+
+        self._start_workers(
+            models,
+            tokenizer_path,
+            cache_max_bytes,
+            scoring_chunk_tokens,
+        )
 
-        # Initialize models in the main thread
-        start_session(model_path)
-        start_tokenizer(tokenizer_path)
+        if index_path:
+            self.store = EmbeddingStore(index_path, index_dtype, models[default_model])
+        self.index_enabled = self.store is not None
 
         logger.info(
-            "Created Reranker pool with %d workers (model: %s, tokenizer: %s)",
+            "Created Reranker pool with %d workers (models: %s, default: %s, "
+            "tokenizer: %s)",
             pool_size,
-            model_path,
+            ", ".join(f"{name}={path}" for name, path in models.items()),
+            default_model,
             tokenizer_path,
         )
 
+        if batch_max_tokens > 0:
+            self.batcher = DynamicBatcher(
+                self.run,
+                inference_and_score_batch,
+                max_concurrency=pool_size,
+                max_batch_tokens=batch_max_tokens,
+                max_wait_us=batch_max_wait_us,
+            )
+            logger.info(
+                "Dynamic batching enabled (max %d tokens, max wait %d us)",
+                batch_max_tokens,
+                batch_max_wait_us,
+            )
+
+    def _start_workers(
+        self,
+        models: dict[str, str],
+        tokenizer_path: str,
+        cache_max_bytes: int,
+        scoring_chunk_tokens: int,
+    ) -> None:
+        start_tokenizer(tokenizer_path)
+        start_embedding_cache(cache_max_bytes)
+        start_scoring(scoring_chunk_tokens)
+        self.profiling_state = multiprocessing.RawValue("q", 0)
+        self._profiling_barrier = threading.Barrier(self.pool_size, timeout=60)
+        start_profiling(
+            self.profiling_state,
+            self._profiling_barrier,
+            self.profile_dir,
+            self.profile_sample_interval,
+            worker_stacks=False,
+        )
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.pool_size,
+            initializer=_start_worker_thread,
+            initargs=(models, itertools.count(), self.pool_size),
+        )
+
+        # Threads are only spawned on demand; occupy all of them at once so
+        # every worker loads its session now instead of on first request
+        barrier = threading.Barrier(self.pool_size, timeout=300)
+        for future in [
+            self.executor.submit(barrier.wait) for _ in range(self.pool_size)
+        ]:
+            future.result()
+
+    async def _acquire_worker(self, cost: int, priority: str | None) -> None:
+        """Wait for the scheduler to hand this task a free worker"""
+        try:
+            await self.scheduler.acquire(cost, priority)
+        except asyncio.CancelledError:
+            CANCELLED_TASKS.inc(state="queued")
+            raise
+
+    def _release_worker_when_done(self, future) -> None:
+        """Free the task's worker slot once the executor has finished it, even if
+        nobody awaits the result anymore"""
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self.scheduler.release)
+        )
+
+    async def run(self, func, *args, cost: int = 0, priority: str | None = None):
+        """Run func(*args) on a pool worker.
+
+        Tasks wait in the scheduler, ordered by their estimated `cost` in
+        tokens and their priority class (the calling request's by default). If
+        the caller is cancelled while the task is still waiting, the task is
+        dropped before it starts.
+        """
+        # queue_wait covers the time spent in the scheduler too
+        submitted_at = monotonic()
+        self.outstanding += 1
+        try:
+            await self._acquire_worker(cost, priority)
+            try:
+                future = self.executor.submit(run_task, submitted_at, func, *args)
+            except BaseException:
+                self.scheduler.release()
+                raise
+            self._release_worker_when_done(future)
+
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                CANCELLED_TASKS.inc(state="queued" if future.cancel() else "running")
+                raise
+        finally:
+            self.outstanding -= 1
+
+    def sync_workers(self) -> None:
+        """Make every worker apply the current profiling state now (blocking)"""
+        try:
+            for future in [
+                self.executor.submit(sync_worker) for _ in range(self.pool_size)
+            ]:
+                future.result()
+        except threading.BrokenBarrierError:
+            self._profiling_barrier.reset()
+            raise
+
+    def resolve_model(self, model: str | None) -> str:
+        """Variant name to run a request with, ValueError if unknown"""
+        if not model:
+            return self.default_model
+        if model not in self.models:
+            raise ValueError(
+                f"Unknown model {model!r}, expected one of {', '.join(self.models)}"
+            )
+        return model
+
+    def indexed_documents(self) -> int:
+        """Number of documents in the store"""
+        return len(self.store) if self.store is not None else 0
+
     def apply(self, func, args):
         """Apply function with args in thread pool"""
         future = self.executor.submit(func, *args)
@@ -66,6 +538,8 @@ class RerankerPool:
 
     def close(self):
         """Close the thread pool"""
+        if self.batcher is not None:
+            self.batcher.close()
         self.executor.shutdown(wait=False)
 
     def join(self):
@@ -74,83 +548,413 @@ class RerankerPool:
 
 
 def create_pool(
-    model_path: str,
+    models: dict[str, str],
     tokenizer_path: str,
     pool_size: int = 1,
+    cache_max_bytes: int = 0,
+    batch_max_tokens: int = 0,
+    batch_max_wait_us: int = 0,
+    index_path: str = "",
+    index_dtype: str = "float16",
+    default_model: str = "",
+    scoring_chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    profile_dir: str = "profiles",
+    profile_sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+    scheduler_aging_rate: float = 0.0,
+    mode: str = "thread",
 ) -> RerankerPool:
-    """Create a thread-based inference pool."""
-    return RerankerPool(model_path, tokenizer_path, pool_size)
+    """Create a thread- or process-based inference pool."""
+    pool_class = RerankerPool
+    if mode == "process":
+        # Imported here, the process pool builds on this module
+        from worker.process_pool import ProcessRerankerPool
+
+        pool_class = ProcessRerankerPool
+    elif mode != "thread":
+        raise ValueError(f"Unknown pool mode {mode!r}, expected thread or process")
+
+    return pool_class(
+        models,
+        tokenizer_path,
+        pool_size,
+        cache_max_bytes,
+        batch_max_tokens,
+        batch_max_wait_us,
+        index_path,
+        index_dtype,
+        default_model,
+        scoring_chunk_tokens,
+        profile_dir,
+        profile_sample_interval,
+        scheduler_aging_rate,
+    )
 
 
-def inference(text_list, max_length):
-    global _session, _tokenizer
+def bucket_length(length: int, max_length: int) -> int:
+    """Round a sequence length up to the nearest padding bucket."""
+    for bucket in PADDING_BUCKETS:
+        if length <= bucket:
+            return min(bucket, max_length)
+    return max_length
+
+
+def _group_by_bucket(lengths: list[int], max_length: int) -> dict[int, list[int]]:
+    """Group positions by padding bucket, shortest sequences first."""
+    groups: dict[int, list[int]] = {}
+    for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+        groups.setdefault(bucket_length(lengths[i], max_length), []).append(i)
+    return groups
+
+
+def inference(text_list, max_length, model=DEFAULT_MODEL):
+    sessions = getattr(_worker, "sessions", None)
+    assert sessions is not None
+    session = sessions[model]
+
+    started = perf_counter()
+    input_ids, token_type_ids, lengths = tokenize(text_list, max_length)
+    observe_stage("tokenize", started)
+    lengths = maximum(lengths, 1)
+    groups = _group_by_bucket(lengths.tolist(), max_length)
+
+    # Batch output is only as long as its longest bucket
+    out_length = max(groups)
+    embeddings = None
+    attention_mask = (arange(out_length) < lengths[:, None]).astype(int64)
+    BATCH_TOKENS.observe(int(lengths.sum()), kind="real")
+    BATCH_TOKENS.observe(
+        sum(len(indices) * length for length, indices in groups.items()),
+        kind="padded",
+    )
 
-    assert _tokenizer is not None
-    assert _session is not None
+    for padded_length, indices in groups.items():
+        # Fancy indexing copies each group into contiguous inputs for ORT
+        group_mask = attention_mask[indices, :padded_length]
+        onnx_inputs = {
+            "input_ids": input_ids[indices, :padded_length],
+            "attention_mask": group_mask,
+            "token_type_ids": token_type_ids[indices, :padded_length],
+        }
+        started = perf_counter()
+        outputs = session.run(None, onnx_inputs)
+        observe_stage("session_run", started)
+
+        started = perf_counter()
+        group_emb = outputs[0]
+        norms = linalg.norm(group_emb, axis=2, keepdims=True)  # type: ignore
+        group_emb = group_emb / clip(norms, a_min=1e-12, a_max=None)
+        observe_stage("normalize", started)
+
+        if embeddings is None:
+            embeddings = zeros(
+                (len(lengths), out_length, group_emb.shape[2]), dtype=group_emb.dtype
+            )
+        embeddings[indices, :padded_length] = group_emb
 
-    _tokenizer.enable_truncation(max_length=max_length)
-    _tokenizer.enable_padding(pad_id=0, pad_token="[PAD]", length=max_length)
+    return embeddings, attention_mask
 
-    encodings = _tokenizer.encode_batch(text_list)
 
-    input_ids = array([e.ids for e in encodings], dtype=int64)
-    attention_mask = array([e.attention_mask for e in encodings], dtype=int64)
+def compute_scores(
+    Q_emb: ndarray,
+    D_emb: ndarray,
+    q_mask: ndarray,
+    d_mask: ndarray | None = None,
+) -> ndarray:
+    """Compute scores for each document."""
+    started = perf_counter()
+    scores = maxsim(Q_emb, q_mask, D_emb, d_mask, _scoring_chunk_tokens)[0]
+    observe_stage("score", started)
+    return scores
 
-    onnx_inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
 
-    token_type_ids = array([e.type_ids for e in encodings], dtype=int64)
-    onnx_inputs["token_type_ids"] = token_type_ids
+def _pad_stack(rows: list[ndarray]) -> tuple[ndarray, ndarray]:
+    """Stack variable-length token embeddings into a padded batch and its mask."""
+    max_length = max(row.shape[0] for row in rows)
+    embeddings = zeros((len(rows), max_length, rows[0].shape[1]), dtype=rows[0].dtype)
+    attention_mask = zeros((len(rows), max_length), dtype=int64)
+    for i, row in enumerate(rows):
+        embeddings[i, : row.shape[0]] = row
+        attention_mask[i, : row.shape[0]] = 1
+    return embeddings, attention_mask
 
-    outputs = _session.run(None, onnx_inputs)
 
-    embeddings = outputs[0]
+def encode_documents(documents, max_len_d, model=DEFAULT_MODEL):
+    """Encode documents, only running the model for embedding cache misses."""
+    if _embedding_cache is None:
+        return inference(documents, max_len_d, model)
 
-    norms = linalg.norm(embeddings, axis=2, keepdims=True)  # type: ignore
-    embeddings = embeddings / clip(norms, a_min=1e-12, a_max=None)
+    keys = [document_key(model, max_len_d, doc) for doc in documents]
+    rows = [_embedding_cache.get(key) for key in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
 
-    return embeddings, attention_mask
+    if missing:
+        # Duplicate texts within a request are encoded once
+        pending = {}
+        for i in missing:
+            pending.setdefault(keys[i], documents[i])
 
+        miss_emb, miss_mask = inference(list(pending.values()), max_len_d, model)
+        computed = {}
+        for key, embedding, mask in zip(pending.keys(), miss_emb, miss_mask):
+            # Only the real tokens are cached, padding is rebuilt per batch
+            computed[key] = embedding[: int(mask.sum())]
+            _embedding_cache.put(key, computed[key])
+        for i in missing:
+            rows[i] = computed[keys[i]]
 
-def compute_scores(
-    Q_emb: ndarray,
-    D_emb: ndarray,
-    q_mask: ndarray,
-) -> ndarray:
-    """Compute scores for each document."""
-    D_emb_T = transpose(D_emb, (0, 2, 1))
-    scores_matrix = matmul(Q_emb, D_emb_T)
-    max_scores = np_max(scores_matrix, axis=2)
-    q_valid_tokens = q_mask[0] == 1
-    final_scores = np_sum(max_scores[:, q_valid_tokens], axis=1)
-    return final_scores
-
-
-def inference_and_score(query, documents, max_len_q, max_len_d):
-    Q_emb, q_mask = inference([query], max_len_q)
-    D_emb, _ = inference(documents, max_len_d)
-    scores = compute_scores(Q_emb, D_emb, q_mask)
+    return _pad_stack(rows)
+
+
+def encode_query(query, max_len_q, model=DEFAULT_MODEL):
+    return inference([query], max_len_q, model)
+
+
+def score_documents(Q_emb, q_mask, documents, max_len_d, model=DEFAULT_MODEL):
+    """Score documents against an already encoded query."""
+    D_emb, d_mask = encode_documents(documents, max_len_d, model)
+    return compute_scores(Q_emb, D_emb, q_mask, d_mask)
+
+
+def inference_and_score(query, documents, max_len_q, max_len_d, model=DEFAULT_MODEL):
+    Q_emb, q_mask = encode_query(query, max_len_q, model)
+    scores = score_documents(Q_emb, q_mask, documents, max_len_d, model)
+    return scores
+
+
+def inference_and_score_batch(requests, max_len_q, max_len_d, model=DEFAULT_MODEL):
+    """Score several (query, documents) requests with one encoder pass each for
+    all queries and all documents."""
+    Q_emb, q_mask = inference([query for query, _ in requests], max_len_q, model)
+    D_emb, d_mask = encode_documents(
+        [doc for _, documents in requests for doc in documents], max_len_d, model
+    )
+
+    results = []
+    offset = 0
+    for i, (_, documents) in enumerate(requests):
+        end = offset + len(documents)
+        results.append(
+            compute_scores(
+                Q_emb[i : i + 1],
+                D_emb[offset:end],
+                q_mask[i : i + 1],
+                d_mask[offset:end],
+            )
+        )
+        offset = end
+    return results
+
+
+def score_queries(queries, documents, max_len_q, max_len_d, model=DEFAULT_MODEL):
+    """Score several queries against the same documents, encoding the
+    documents once and all queries in one batch. Returns (queries, documents)."""
+    Q_emb, q_mask = inference(queries, max_len_q, model)
+    D_emb, d_mask = encode_documents(documents, max_len_d, model)
+    started = perf_counter()
+    scores = maxsim(Q_emb, q_mask, D_emb, d_mask, _scoring_chunk_tokens)
+    observe_stage("score", started)
     return scores
 
 
+def embed_documents(documents, max_len_d, model=DEFAULT_MODEL):
+    """Encode documents into per-document token embeddings (real tokens only)."""
+    D_emb, d_mask = inference(documents, max_len_d, model)
+    lengths = d_mask.sum(axis=1)
+    return [embedding[:length] for embedding, length in zip(D_emb, lengths)]
+
+
+def score_embeddings(query, D_emb, d_mask, max_len_q, model=DEFAULT_MODEL):
+    """Score a query against already encoded documents."""
+    Q_emb, q_mask = encode_query(query, max_len_q, model)
+    return compute_scores(Q_emb, D_emb, q_mask, d_mask)
+
+
 async def rerank(
     query: str,
     documents: list[str],
     max_len_q: int,
     max_len_d: int,
     inference_pool: RerankerPool,
+    model: str | None = None,
+    chunk_size: int = 0,
 ) -> ndarray:
-    """Run prediction using thread pool."""
+    """Run prediction using thread pool.
+
+    Requests with more than `chunk_size` documents (if set) are scored chunk
+    by chunk, so a cancelled call stops at the next chunk boundary.
+    """
     try:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            inference_pool.executor,
+        model = inference_pool.resolve_model(model)
+        if 0 < chunk_size < len(documents):
+            return await _rerank_chunked(
+                query,
+                documents,
+                max_len_q,
+                max_len_d,
+                inference_pool,
+                model,
+                chunk_size,
+            )
+
+        if inference_pool.batcher is not None:
+            return await inference_pool.batcher.submit(
+                query, documents, max_len_q, max_len_d, model
+            )
+
+        result = await inference_pool.run(
             inference_and_score,
             query,
             documents,
             max_len_q,
             max_len_d,
+            model,
+            cost=max_len_q + len(documents) * max_len_d,
         )
         return result
     except Exception as e:
         logger.error("Error predicting: %s", e)
         return array([])
+
+
+async def _rerank_chunked(
+    query: str,
+    documents: list[str],
+    max_len_q: int,
+    max_len_d: int,
+    inference_pool: RerankerPool,
+    model: str,
+    chunk_size: int,
+) -> ndarray:
+    """Encode the query once, then score the documents one pool task per chunk"""
+    Q_emb, q_mask = await inference_pool.run(
+        encode_query, query, max_len_q, model, cost=max_len_q
+    )
+
+    chunks = [
+        documents[start : start + chunk_size]
+        for start in range(0, len(documents), chunk_size)
+    ]
+    scores = []
+    for i, chunk in enumerate(chunks):
+        try:
+            scores.append(
+                await inference_pool.run(
+                    score_documents,
+                    Q_emb,
+                    q_mask,
+                    chunk,
+                    max_len_d,
+                    model,
+                    cost=len(chunk) * max_len_d,
+                )
+            )
+        except asyncio.CancelledError:
+            CANCELLED_TASKS.inc(len(chunks) - i - 1, state="skipped")
+            raise
+    return concatenate(scores)
+
+
+async def rerank_batch(
+    queries: list[str],
+    documents: list[str],
+    max_len_q: int,
+    max_len_d: int,
+    inference_pool: RerankerPool,
+    model: str | None = None,
+) -> ndarray:
+    """Score every query against every document using the pool."""
+    return await inference_pool.run(
+        score_queries,
+        queries,
+        documents,
+        max_len_q,
+        max_len_d,
+        inference_pool.resolve_model(model),
+        cost=len(queries) * max_len_q + len(documents) * max_len_d,
+    )
+
+
+async def rerank_stream(
+    query: str,
+    chunks: AsyncIterator[list[str]],
+    max_len_q: int,
+    max_len_d: int,
+    inference_pool: RerankerPool,
+    model: str | None = None,
+) -> AsyncIterator[tuple[int, ndarray]]:
+    """Score documents chunk by chunk as they arrive, yielding each chunk's
+    offset and scores so memory stays bounded by the chunk size."""
+    model = inference_pool.resolve_model(model)
+    Q_emb, q_mask = await inference_pool.run(
+        encode_query, query, max_len_q, model, cost=max_len_q
+    )
+
+    offset = 0
+    async for documents in chunks:
+        if not documents:
+            continue
+        scores = await inference_pool.run(
+            score_documents,
+            Q_emb,
+            q_mask,
+            documents,
+            max_len_d,
+            model,
+            cost=len(documents) * max_len_d,
+        )
+        yield offset, scores
+        offset += len(documents)
+
+
+async def index(
+    doc_ids: list[str],
+    documents: list[str],
+    max_len_d: int,
+    inference_pool: RerankerPool,
+    batch_size: int = INDEX_BATCH_SIZE,
+) -> int:
+    """Encode documents on the pool and append them to the store."""
+    assert inference_pool.store is not None
+
+    loop = asyncio.get_event_loop()
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start : start + batch_size]
+        embeddings = await inference_pool.run(
+            embed_documents,
+            batch,
+            max_len_d,
+            inference_pool.default_model,
+            cost=len(batch) * max_len_d,
+        )
+        # Appends are file I/O, keep them off the event loop
+        await loop.run_in_executor(
+            None,
+            inference_pool.store.add_many,
+            doc_ids[start : start + batch_size],
+            embeddings,
+        )
+    return len(doc_ids)
+
+
+async def rerank_by_ids(
+    query: str,
+    doc_ids: list[str],
+    max_len_q: int,
+    inference_pool: RerankerPool,
+) -> ndarray:
+    """Score indexed documents using the pool."""
+    assert inference_pool.store is not None
+
+    loop = asyncio.get_event_loop()
+    D_emb, d_mask = await loop.run_in_executor(
+        None, inference_pool.store.get_many, doc_ids
+    )
+    return await inference_pool.run(
+        score_embeddings,
+        query,
+        D_emb,
+        d_mask,
+        max_len_q,
+        inference_pool.default_model,
+        cost=max_len_q + len(doc_ids),
+    )
@@ -0,0 +1,232 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from time import monotonic
+
+import metrics
+from logger import get_logger
+from worker.inference import (
+    RerankerPool,
+    run_task,
+    start_embedding_cache,
+    start_profiling,
+    start_scoring,
+    start_session,
+    start_tokenizer,
+)
+from worker.shared import release, run_shared, share, unshare
+
+logger = get_logger()
+
+
+def _exit_with_parent() -> None:
+    """Stop the worker when the server process goes away without shutting the
+    pool down (e.g. killed by a signal), instead of leaving it orphaned"""
+    parent = multiprocessing.parent_process()
+    if parent is not None:
+        parent.join()
+    os._exit(0)
+
+
+def init_worker(
+    models: dict[str, str],
+    tokenizer_path: str,
+    cache_max_bytes: int,
+    scoring_chunk_tokens: int,
+    profile_dir: str,
+    profile_sample_interval: float,
+    profiling_state,
+    profiling_barrier,
+    worker_ids,
+    workers: int,
+) -> None:
+    """Load the model into a freshly started worker process"""
+    threading.Thread(target=_exit_with_parent, daemon=True).start()
+    with worker_ids.get_lock():
+        worker_index = worker_ids.value
+        worker_ids.value += 1
+    # Replacement processes take over the core slices of the ones they replace
+    start_session(models, worker_index % workers, workers)
+    start_tokenizer(tokenizer_path)
+    start_embedding_cache(cache_max_bytes)
+    start_scoring(scoring_chunk_tokens)
+    start_profiling(
+        profiling_state,
+        profiling_barrier,
+        profile_dir,
+        profile_sample_interval,
+        worker_stacks=True,
+    )
+
+
+def ping() -> int:
+    return os.getpid()
+
+
+def run_in_worker(submitted_at: float, func, *args):
+    """Run a task in a worker process, returning its (shared) result together
+    with the metrics it recorded, which only the server process exposes"""
+    return run_task(submitted_at, run_shared, func, *args), metrics.drain()
+
+
+def _discard_result(future: Future) -> None:
+    """Free the shared memory of a result nobody is waiting for anymore"""
+    if not future.cancelled() and future.exception() is None:
+        result, samples = future.result()
+        metrics.merge(samples)
+        unshare(result)
+
+
+class ProcessRerankerPool(RerankerPool):
+    """Process-based inference pool.
+
+    Every worker is a separate process with its own ORT session, tokenizer and
+    embedding cache, so tokenization and numpy glue do not contend for one GIL.
+    Large arrays cross the process boundary through shared memory instead of
+    being pickled. A dead worker breaks the executor, which is then replaced;
+    a background task pings the pool every HEALTH_CHECK_INTERVAL seconds so
+    this also happens while the server is idle.
+    """
+
+    HEALTH_CHECK_INTERVAL = 10.0
+
+    def _start_workers(
+        self,
+        models: dict[str, str],
+        tokenizer_path: str,
+        cache_max_bytes: int,
+        scoring_chunk_tokens: int,
+    ) -> None:
+        self._mp_context = multiprocessing.get_context("spawn")
+        self.profiling_state = self._mp_context.RawValue("q", 0)
+        self._profiling_barrier = self._mp_context.Barrier(self.pool_size, timeout=60)
+        # Each process holds its own cache, split the budget between them
+        self._initargs = (
+            models,
+            tokenizer_path,
+            cache_max_bytes // self.pool_size,
+            scoring_chunk_tokens,
+            self.profile_dir,
+            self.profile_sample_interval,
+            self.profiling_state,
+            self._profiling_barrier,
+            self._mp_context.Value("i", 0),
+            self.pool_size,
+        )
+        self._restart_lock = threading.Lock()
+        self._monitor_task: asyncio.Task | None = None
+        self.restarts = 0
+        self.executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            # Forking a process that already runs ORT/gRPC threads is unsafe
+            mp_context=self._mp_context,
+            initializer=init_worker,
+            initargs=self._initargs,
+        )
+
+        # Spawn every worker and load the model now instead of on first request
+        for future in [executor.submit(ping) for _ in range(self.pool_size)]:
+            future.result()
+        logger.info("Started %d inference worker processes", self.pool_size)
+        return executor
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._restart_lock:
+            if self.executor is not broken:
+                # Another caller already replaced it
+                return
+            logger.error("An inference worker process died, restarting the pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._create_executor()
+            self.restarts += 1
+
+    def _ensure_monitor(self) -> None:
+        if self._monitor_task is None or self._monitor_task.done():
+            self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.HEALTH_CHECK_INTERVAL)
+            try:
+                await self.run(ping, priority="high")
+            except BrokenProcessPool:
+                pass
+            except Exception as e:
+                logger.error("Inference pool health check failed: %s", e)
+
+    async def run(self, func, *args, cost: int = 0, priority: str | None = None):
+        """Run func(*args) in a worker process, passing arrays by shared memory"""
+        self._ensure_monitor()
+
+        # queue_wait covers the time spent in the scheduler too
+        submitted_at = monotonic()
+        self.outstanding += 1
+        try:
+            await self._acquire_worker(cost, priority)
+            return await self._run_acquired(func, args, submitted_at)
+        finally:
+            self.outstanding -= 1
+
+    async def _run_acquired(self, func, args, submitted_at: float):
+        executor = self.executor
+        inputs: list[SharedMemory] = []
+        try:
+            shared_args = share(args, inputs)
+            future = executor.submit(run_in_worker, submitted_at, func, *shared_args)
+        except BaseException as e:
+            self.scheduler.release()
+            release(inputs, unlink=True)
+            if isinstance(e, BrokenProcessPool):
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._restart, executor
+                )
+            raise
+        self._release_worker_when_done(future)
+
+        try:
+            result, samples = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            metrics.CANCELLED_TASKS.inc(
+                state="queued" if future.cancel() else "running"
+            )
+            future.add_done_callback(_discard_result)
+            raise
+        except BrokenProcessPool:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._restart, executor
+            )
+            raise
+        finally:
+            if future.done() or future.cancel():
+                release(inputs, unlink=True)
+            else:
+                # Still running: free the inputs once the worker is done
+                future.add_done_callback(lambda _: release(inputs, unlink=True))
+
+        metrics.merge(samples)
+        return unshare(result)
+
+    def apply(self, func, args):
+        """Apply function with args in a worker process"""
+        inputs: list[SharedMemory] = []
+        try:
+            future = self.executor.submit(
+                run_in_worker, monotonic(), func, *share(args, inputs)
+            )
+            result, samples = future.result()
+            metrics.merge(samples)
+            return unshare(result)
+        finally:
+            release(inputs, unlink=True)
+
+    def close(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+        super().close()
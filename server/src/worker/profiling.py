@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def _timestamp_us() -> float:
+    # monotonic() is system wide, so traces of the server and of its worker
+    # processes share one timeline
+    return time.monotonic() * 1_000_000
+
+
+def _frame_names(frame) -> list[str]:
+    """Function names of a stack, outermost first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+            f"{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class StackSampler:
+    """Sampling profiler for the Python threads of this process.
+
+    A background thread snapshots every other thread's stack each `interval`
+    seconds. Consecutive samples sharing a call prefix become one slice, so the
+    result reads as a flame chart in chrome://tracing or Perfetto. Functions
+    shorter than the interval are only seen if a sample happens to hit them.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._events: list[dict] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> list[dict]:
+        """Stop sampling and return the Chrome trace events"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self._events
+
+    def _emit(self, phase: str, name: str, tid: int, ts: float) -> None:
+        self._events.append(
+            {"name": name, "ph": phase, "ts": ts, "pid": os.getpid(), "tid": tid}
+        )
+
+    def _transition(self, tid: int, old: list[str], new: list[str], ts: float):
+        common = 0
+        for old_name, new_name in zip(old, new):
+            if old_name != new_name:
+                break
+            common += 1
+        for name in reversed(old[common:]):
+            self._emit("E", name, tid, ts)
+        for name in new[common:]:
+            self._emit("B", name, tid, ts)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        stacks: dict[int, list[str]] = {}
+        while not self._stop.wait(self.interval):
+            ts = _timestamp_us()
+            frames = sys._current_frames()
+            for tid, frame in frames.items():
+                if tid != own:
+                    stack = _frame_names(frame)
+                    self._transition(tid, stacks.get(tid, []), stack, ts)
+                    stacks[tid] = stack
+            for tid in [tid for tid in stacks if tid not in frames]:
+                self._transition(tid, stacks.pop(tid), [], ts)
+
+        ts = _timestamp_us()
+        for tid, stack in stacks.items():
+            self._transition(tid, stack, [], ts)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for tid in {event["tid"] for event in self._events}:
+            self._events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": names.get(tid, str(tid))},
+                }
+            )
+
+
+def write_trace(path: str, events: list[dict]) -> None:
+    """Write events as a Chrome trace (JSON object format)"""
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def session_directory(base: str, session_id: int) -> str:
+    """Directory that collects the traces of one profiling session"""
+    return os.path.join(
+        base, time.strftime("%Y%m%d-%H%M%S", time.localtime(session_id))
+    )
+
+
+class Profiler:
+    """Profiles the server for the next `requests` calls or `seconds` seconds,
+    whichever comes first.
+
+    Starting a session publishes its id through `pool.profiling_state`; pool
+    workers pick it up before their next task and switch to ORT sessions with
+    profiling enabled (see `worker.inference.sync_profiling`). The server
+    process samples its Python stacks meanwhile. When the session ends, every
+    worker writes its ORT profile and the traces land in a timestamped
+    directory under `directory`.
+    """
+
+    def __init__(
+        self,
+        pool,
+        directory: str,
+        requests: int = 100,
+        seconds: float = 30.0,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+    ):
+        self.pool = pool
+        self.directory = directory
+        self.requests = requests
+        self.seconds = seconds
+        self.sample_interval = sample_interval
+
+        self._session_id = 0
+        self._remaining = 0
+        self._sampler: StackSampler | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._stopping: asyncio.Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._sampler is not None
+
+    def start(self) -> str | None:
+        """Start a profiling session, returns its trace directory (None if one
+        is already running)"""
+        if self.active:
+            logger.warning("Profiling is already running")
+            return None
+
+        self._session_id = max(int(time.time()), self._session_id + 1)
+        path = session_directory(self.directory, self._session_id)
+        os.makedirs(path, exist_ok=True)
+
+        self._remaining = self.requests
+        self._sampler = StackSampler(self.sample_interval)
+        self._sampler.start()
+        self.pool.profiling_state.value = self._session_id
+        if self.seconds > 0:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.seconds, self.stop
+            )
+        logger.info(
+            "Profiling the next %s requests or %s seconds into %s",
+            self.requests or "unlimited",
+            self.seconds or "unlimited",
+            path,
+        )
+        return path
+
+    def request_finished(self) -> None:
+        """Count a finished call towards the session's request limit"""
+        if not self.active or self.requests <= 0:
+            return
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self.stop()
+
+    def stop(self) -> None:
+        """End the running session, traces are written in the background"""
+        if not self.active or self._stopping is not None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._stopping = asyncio.get_running_loop().create_task(self._finish())
+
+    async def _finish(self) -> None:
+        path = session_directory(self.directory, self._session_id)
+        try:
+            self.pool.profiling_state.value = 0
+            loop = asyncio.get_running_loop()
+            assert self._sampler is not None
+            events = await loop.run_in_executor(None, self._sampler.stop)
+            await loop.run_in_executor(
+                None,
+                write_trace,
+                os.path.join(path, f"python-{os.getpid()}.json"),
+                events,
+            )
+            # Idle workers only notice the end of the session when they run
+            # something, make every one of them write its traces now
+            await loop.run_in_executor(None, self.pool.sync_workers)
+            logger.info("Wrote profiling traces to %s", path)
+        except Exception as e:
+            logger.error("Error writing profiling traces: %s", e)
+        finally:
+            self._sampler = None
+            self._stopping = None
@@ -0,0 +1,81 @@
+import asyncio
+import heapq
+import itertools
+from contextvars import ContextVar
+
+from logger import get_logger
+
+logger = get_logger()
+
+# A task of a lower priority class is ordered as if it had arrived this many
+# seconds later than it did
+PRIORITY_DELAYS = {"high": 0.0, "normal": 1.0, "low": 10.0}
+DEFAULT_PRIORITY = "normal"
+
+# Priority class of the calling request, set by the gRPC handlers
+request_priority: ContextVar[str] = ContextVar(
+    "request_priority", default=DEFAULT_PRIORITY
+)
+
+
+class FairScheduler:
+    """Hands out the pool's worker slots by estimated cost instead of FIFO.
+
+    Waiting tasks are ordered by their arrival time, plus the delay of their
+    priority class, plus `cost / aging_rate` seconds. Small tasks therefore
+    overtake large ones (shortest-job-first), but only by a bounded amount of
+    time: a large task stops being overtaken once it has waited as long as its
+    cost, so nothing starves. `aging_rate` is in tokens per second; 0 ignores
+    the cost and keeps arrival order.
+
+    At most `slots` tasks hold a slot at a time, so the executor never queues
+    and the order here is the order in which tasks run. Runs on the event loop
+    only.
+    """
+
+    def __init__(self, slots: int, aging_rate: float = 0.0):
+        self.slots = slots
+        self.aging_rate = aging_rate
+        self.running = 0
+        self._waiting: list[tuple[float, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def _key(self, cost: int, priority: str | None, now: float) -> float:
+        priority = priority or request_priority.get()
+        key = now + PRIORITY_DELAYS.get(priority, PRIORITY_DELAYS[DEFAULT_PRIORITY])
+        if self.aging_rate > 0:
+            key += cost / self.aging_rate
+        return key
+
+    async def acquire(self, cost: int = 0, priority: str | None = None) -> None:
+        """Wait for a free slot, release() it when the task is done"""
+        if self.running < self.slots and not self._waiting:
+            self.running += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(
+            self._waiting,
+            (self._key(cost, priority, loop.time()), next(self._counter), future),
+        )
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Give the slot to the next waiting task, or free it"""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                # Cancelled waiters are skipped here instead of being removed
+                future.set_result(None)
+                return
+        self.running -= 1
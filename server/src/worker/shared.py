@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+from numpy import array, dtype, ndarray
+
+# Smaller arrays are cheaper to pickle than to map
+SHARED_MEMORY_MIN_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Picklable handle to an ndarray that lives in a shared memory block"""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+def _to_shared(value: ndarray, segments: list[SharedMemory]) -> SharedArray:
+    segment = SharedMemory(create=True, size=max(value.nbytes, 1))
+    view = ndarray(value.shape, dtype=value.dtype, buffer=segment.buf)
+    view[...] = value
+    del view
+    segments.append(segment)
+    return SharedArray(segment.name, value.shape, value.dtype.str)
+
+
+def _from_shared(handle: SharedArray, copy: bool, segments: list[SharedMemory]):
+    segment = SharedMemory(name=handle.name)
+    view = ndarray(handle.shape, dtype=dtype(handle.dtype), buffer=segment.buf)
+    if not copy:
+        # The caller keeps the segment open for as long as it uses the view
+        segments.append(segment)
+        return view
+    value = array(view)
+    del view
+    segment.close()
+    segment.unlink()
+    return value
+
+
+def share(value, segments: list[SharedMemory]):
+    """Replace large ndarrays (also inside tuples and lists) with shared memory
+    handles. Created segments are appended to `segments`."""
+    if isinstance(value, ndarray) and value.nbytes >= SHARED_MEMORY_MIN_BYTES:
+        return _to_shared(value, segments)
+    if isinstance(value, tuple):
+        return tuple(share(item, segments) for item in value)
+    if isinstance(value, list):
+        return [share(item, segments) for item in value]
+    return value
+
+
+def unshare(value, copy: bool = True, segments: list[SharedMemory] | None = None):
+    """Inverse of `share`.
+
+    With copy=True the arrays are copied out and their segments unlinked, which
+    is how the receiving side takes ownership of results. With copy=False the
+    arrays are zero-copy views and the opened segments are appended to
+    `segments`, to be closed once the views are no longer used.
+    """
+    if isinstance(value, SharedArray):
+        return _from_shared(value, copy, segments if segments is not None else [])
+    if isinstance(value, tuple):
+        return tuple(unshare(item, copy, segments) for item in value)
+    if isinstance(value, list):
+        return [unshare(item, copy, segments) for item in value]
+    return value
+
+
+def release(segments: list[SharedMemory], unlink: bool = False) -> None:
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            # A view is still referenced (e.g. by a traceback), the mapping is
+            # closed when it is garbage collected
+            pass
+        if unlink:
+            segment.unlink()
+    segments.clear()
+
+
+def run_shared(func, *args):
+    """Worker process entry point: map shared inputs, run func, share outputs."""
+    inputs: list[SharedMemory] = []
+    outputs: list[SharedMemory] = []
+    try:
+        result = func(*unshare(args, copy=False, segments=inputs))
+        shared_result = share(result, outputs)
+        # The parent unlinks output segments after copying them out
+        release(outputs)
+        return shared_result
+    finally:
+        release(inputs)
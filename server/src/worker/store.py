@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+
+from numpy import abs as np_abs
+from numpy import dtype as np_dtype
+from numpy import float16, float32, int8, int64, maximum, memmap, ndarray, rint, zeros
+
+from logger import get_logger
+
+logger = get_logger()
+
+STORAGE_DTYPES = {"float16": float16, "int8": int8}
+
+
+class DocumentNotFoundError(KeyError):
+    """Raised when a document id has not been indexed"""
+
+    def __init__(self, doc_ids: list[str]):
+        super().__init__(doc_ids)
+        self.doc_ids = doc_ids
+
+    def __str__(self) -> str:
+        shown = ", ".join(self.doc_ids[:10])
+        more = f" (+{len(self.doc_ids) - 10} more)" if len(self.doc_ids) > 10 else ""
+        return f"Unknown document ids: {shown}{more}"
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped store of document token embeddings.
+
+    Layout of the store directory:
+        meta.json      embedding dim, storage dtype and model
+        tokens.bin     one row per document token, float16 or int8
+        scales.bin     float32 dequantization scale per token row (int8 only)
+        entries.jsonl  one {"id", "offset", "length"} record per indexed document
+
+    Token rows are flushed before their entry is written, so a crash can only
+    lose documents that were never acknowledged. Re-indexing an id appends a new
+    copy and the latest entry wins.
+    """
+
+    def __init__(self, path: str, dtype: str = "float16", model_id: str = ""):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(
+                f"Unsupported index dtype {dtype!r}, expected one of "
+                f"{', '.join(STORAGE_DTYPES)}"
+            )
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._meta_path = os.path.join(path, "meta.json")
+        self._tokens_path = os.path.join(path, "tokens.bin")
+        self._scales_path = os.path.join(path, "scales.bin")
+        self._entries_path = os.path.join(path, "entries.jsonl")
+
+        self.dim: int | None = None
+        self.dtype = dtype
+        self.model_id = model_id
+        self._load_meta()
+        self._storage_dtype = np_dtype(STORAGE_DTYPES[self.dtype])
+
+        self._entries: dict[str, tuple[int, int]] = {}
+        self._num_rows = 0
+        self._tokens_map: memmap | None = None
+        self._scales_map: memmap | None = None
+        self._mapped_rows = 0
+        self._lock = threading.Lock()
+        self._load_entries()
+
+        logger.info(
+            "Opened document index at %s (%d documents, %d token rows, %s)",
+            path,
+            len(self._entries),
+            self._num_rows,
+            self.dtype,
+        )
+
+    def _load_meta(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        if meta["dtype"] != self.dtype:
+            logger.warning(
+                "Index at %s is stored as %s, ignoring requested %s",
+                self.path,
+                meta["dtype"],
+                self.dtype,
+            )
+            self.dtype = meta["dtype"]
+        if meta.get("model") and meta["model"] != self.model_id:
+            logger.warning(
+                "Index at %s was built with %s but the server runs %s",
+                self.path,
+                meta["model"],
+                self.model_id,
+            )
+
+    def _write_meta(self) -> None:
+        with open(self._meta_path, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype, "model": self.model_id}, f)
+
+    def _load_entries(self) -> None:
+        if self.dim is None:
+            return
+
+        row_bytes = self.dim * self._storage_dtype.itemsize
+        if os.path.exists(self._tokens_path):
+            self._num_rows = os.path.getsize(self._tokens_path) // row_bytes
+        if self.dtype == "int8" and os.path.exists(self._scales_path):
+            scale_rows = os.path.getsize(self._scales_path) // float32().itemsize
+            self._num_rows = min(self._num_rows, scale_rows)
+
+        # Drop rows of an interrupted append so new rows stay aligned
+        if os.path.exists(self._tokens_path):
+            os.truncate(self._tokens_path, self._num_rows * row_bytes)
+        if self.dtype == "int8" and os.path.exists(self._scales_path):
+            os.truncate(self._scales_path, self._num_rows * float32().itemsize)
+
+        if not os.path.exists(self._entries_path):
+            return
+        with open(self._entries_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write of the last entry
+                    continue
+                if entry["offset"] + entry["length"] <= self._num_rows:
+                    self._entries[entry["id"]] = (entry["offset"], entry["length"])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._entries
+
+    def _quantize(self, rows: ndarray) -> tuple[ndarray, ndarray | None]:
+        if self.dtype == "int8":
+            scales = maximum(np_abs(rows).max(axis=1), 1e-12) / 127.0
+            quantized = rint(rows / scales[:, None]).astype(int8)
+            return quantized, scales.astype(float32)
+        return rows.astype(float16), None
+
+    def add_many(self, doc_ids: list[str], embeddings: list[ndarray]) -> None:
+        """Append the token embeddings (length x dim) of each document."""
+        if not doc_ids:
+            return
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(embeddings[0].shape[1])
+                self._write_meta()
+
+            records = []
+            with open(self._tokens_path, "ab") as tokens_file, open(
+                self._scales_path, "ab"
+            ) as scales_file:
+                for doc_id, embedding in zip(doc_ids, embeddings):
+                    if embedding.shape[1] != self.dim:
+                        raise ValueError(
+                            f"Embedding dim {embedding.shape[1]} does not match "
+                            f"index dim {self.dim}"
+                        )
+                    quantized, scales = self._quantize(embedding)
+                    tokens_file.write(quantized.tobytes())
+                    if scales is not None:
+                        scales_file.write(scales.tobytes())
+                    records.append((doc_id, self._num_rows, len(embedding)))
+                    self._num_rows += len(embedding)
+                tokens_file.flush()
+                os.fsync(tokens_file.fileno())
+                scales_file.flush()
+                os.fsync(scales_file.fileno())
+
+            with open(self._entries_path, "a") as entries_file:
+                for doc_id, offset, length in records:
+                    entries_file.write(
+                        json.dumps({"id": doc_id, "offset": offset, "length": length})
+                        + "\n"
+                    )
+                    self._entries[doc_id] = (offset, length)
+
+    def _maps(self) -> tuple[memmap, memmap | None]:
+        """Memory-map the token rows, remapping after the files have grown."""
+        if self._tokens_map is None or self._mapped_rows != self._num_rows:
+            self._tokens_map = memmap(
+                self._tokens_path,
+                dtype=self._storage_dtype,
+                mode="r",
+                shape=(self._num_rows, self.dim),
+            )
+            if self.dtype == "int8":
+                self._scales_map = memmap(
+                    self._scales_path,
+                    dtype=float32,
+                    mode="r",
+                    shape=(self._num_rows,),
+                )
+            self._mapped_rows = self._num_rows
+        return self._tokens_map, self._scales_map
+
+    def get_many(self, doc_ids: list[str]) -> tuple[ndarray, ndarray]:
+        """Load documents as a padded float32 batch and its attention mask."""
+        with self._lock:
+            missing = [doc_id for doc_id in doc_ids if doc_id not in self._entries]
+            if missing:
+                raise DocumentNotFoundError(missing)
+            spans = [self._entries[doc_id] for doc_id in doc_ids]
+            tokens, scales = self._maps()
+
+        max_length = max(length for _, length in spans)
+        embeddings = zeros((len(spans), max_length, self.dim), dtype=float32)
+        attention_mask = zeros((len(spans), max_length), dtype=int64)
+        for i, (offset, length) in enumerate(spans):
+            rows = tokens[offset : offset + length].astype(float32)
+            if scales is not None:
+                rows *= scales[offset : offset + length, None]
+            embeddings[i, :length] = rows
+            attention_mask[i, :length] = 1
+        return embeddings, attention_mask
@@ -0,0 +1,42 @@
+import asyncio
+import socket
+
+import metrics
+
+
+async def scrape(server, request: bytes) -> bytes:
+    # Port 0 picks a free port per address family, use the IPv4 one
+    port = next(
+        sock.getsockname()[1]
+        for sock in server.sockets
+        if sock.family == socket.AF_INET
+    )
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(request)
+    try:
+        return await asyncio.wait_for(reader.read(), 5)
+    finally:
+        writer.close()
+
+
+def test_metrics_endpoint_serves_metrics():
+    async def main():
+        server = await metrics.start_metrics_server(0)
+        async with server:
+            return await scrape(server, b"GET /metrics HTTP/1.1\r\n\r\n")
+
+    response = asyncio.run(main())
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b"reranker_requests_total" in response
+
+
+def test_idle_metrics_connection_is_closed(monkeypatch):
+    monkeypatch.setattr(metrics, "SCRAPE_TIMEOUT", 0.1)
+
+    async def main():
+        server = await metrics.start_metrics_server(0)
+        async with server:
+            # Connects but never sends a request
+            return await scrape(server, b"")
+
+    assert asyncio.run(main()) == b""
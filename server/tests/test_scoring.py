@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from worker.scoring import maxsim
+
+
+def embed(rng, n, max_len, min_len, dim=16):
+    lengths = rng.integers(min_len, max_len + 1, size=n)
+    mask = (np.arange(max_len) < lengths[:, None]).astype(np.int64)
+    emb = rng.standard_normal((n, max_len, dim)).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=2, keepdims=True)
+    return emb * mask[:, :, None], mask
+
+
+def dense_scores(Q_emb, q_mask, D_emb, d_mask):
+    """Reference MaxSim over the full (queries, docs, Lq, Ld) similarity tensor"""
+    similarity = np.einsum("qid,njd->qnij", Q_emb, D_emb)
+    similarity = np.where(d_mask[None, :, None, :] == 1, similarity, -np.inf)
+    best = similarity.max(axis=3)
+    return np.where(q_mask[:, None, :] == 1, best, 0.0).sum(axis=2)
+
+
+@pytest.mark.parametrize("chunk_tokens", [1, 50, 4096])
+def test_maxsim_matches_dense_reference(chunk_tokens):
+    rng = np.random.default_rng(0)
+    Q_emb, q_mask = embed(rng, 3, 8, 2)
+    D_emb, d_mask = embed(rng, 40, 20, 1)
+
+    scores = maxsim(Q_emb, q_mask, D_emb, d_mask, chunk_tokens)
+
+    assert scores.shape == (3, 40)
+    assert scores.dtype == np.float32
+    np.testing.assert_allclose(
+        scores, dense_scores(Q_emb, q_mask, D_emb, d_mask), atol=1e-4
+    )
+
+
+def test_maxsim_scores_float16_embeddings_in_float32():
+    rng = np.random.default_rng(1)
+    Q_emb, q_mask = embed(rng, 1, 8, 4)
+    D_emb, d_mask = embed(rng, 10, 12, 3)
+    D_half = D_emb.astype(np.float16)
+
+    scores = maxsim(Q_emb, q_mask, D_half, d_mask)
+
+    assert scores.dtype == np.float32
+    expected = dense_scores(Q_emb, q_mask, D_half.astype(np.float32), d_mask)
+    np.testing.assert_allclose(scores, expected, atol=1e-4)
+
+
+def test_maxsim_without_document_mask_uses_every_token():
+    rng = np.random.default_rng(2)
+    Q_emb, q_mask = embed(rng, 2, 6, 3)
+    D_emb, _ = embed(rng, 5, 7, 7)
+
+    scores = maxsim(Q_emb, q_mask, D_emb, None, chunk_tokens=10)
+
+    expected = dense_scores(Q_emb, q_mask, D_emb, np.ones((5, 7), dtype=np.int64))
+    np.testing.assert_allclose(scores, expected, atol=1e-4)
+
+
+def test_maxsim_empty_documents_and_queries():
+    rng = np.random.default_rng(3)
+    Q_emb, q_mask = embed(rng, 2, 4, 2)
+    q_mask[1] = 0
+    D_emb, d_mask = embed(rng, 3, 5, 2)
+    d_mask[1] = 0
+
+    scores = maxsim(Q_emb, q_mask, D_emb, d_mask)
+
+    # A document without tokens never matches, a query without tokens scores 0
+    assert scores[0, 1] == -np.inf
+    assert np.isfinite(scores[0, [0, 2]]).all()
+    assert (scores[1] == 0.0).all()
+    assert maxsim(Q_emb, q_mask, D_emb[:0], d_mask[:0]).shape == (2, 0)
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from grpc import StatusCode
+from numpy import zeros
+
+from reranker_pb2 import RerankStreamRequest
+from server import OnnxRerankerService
+from worker.inference import DEFAULT_MODEL, score_documents
+
+
+class Aborted(Exception):
+    pass
+
+
+class FakeContext:
+    def __init__(self):
+        self.code = None
+        self.details = None
+
+    def invocation_metadata(self):
+        return ()
+
+    def time_remaining(self):
+        return None
+
+    def set_code(self, code):
+        self.code = code
+
+    def set_details(self, details):
+        self.details = details
+
+    async def abort(self, code, details):
+        self.code = code
+        self.details = details
+        raise Aborted(details)
+
+
+class FakePool:
+    """Scores every document 0 and records the size of each scored chunk"""
+
+    def __init__(self):
+        self.chunk_sizes = []
+
+    def resolve_model(self, model=None):
+        return model or DEFAULT_MODEL
+
+    async def run(self, func, *args, cost=0):
+        if func is score_documents:
+            documents = args[2]
+            self.chunk_sizes.append(len(documents))
+            return zeros(len(documents))
+        return None, None
+
+
+def make_service(pool):
+    return OnnxRerankerService(pool, stream_chunk_size=4, max_stream_chunk_size=8)
+
+
+async def collect(stream):
+    return [response async for response in stream]
+
+
+async def requests(*messages):
+    for message in messages:
+        yield message
+
+
+def rerank_stream(chunk_size, documents):
+    pool = FakePool()
+    context = FakeContext()
+    request = RerankStreamRequest(query="q", documents=documents, chunk_size=chunk_size)
+    responses = asyncio.run(collect(make_service(pool).RerankStream(request, context)))
+    return pool, responses
+
+
+def rerank_bidi_stream(chunk_size, *batches):
+    pool = FakePool()
+    context = FakeContext()
+    messages = [RerankStreamRequest(query="q", chunk_size=chunk_size)]
+    messages += [RerankStreamRequest(documents=batch) for batch in batches]
+    responses = asyncio.run(
+        collect(make_service(pool).RerankBidiStream(requests(*messages), context))
+    )
+    return pool, responses
+
+
+@pytest.mark.parametrize("call", [rerank_stream, rerank_bidi_stream])
+def test_negative_chunk_size_is_rejected(call):
+    with pytest.raises(Aborted, match="chunk_size"):
+        call(-1, ["a", "b", "c"])
+
+
+def test_stream_zero_chunk_size_uses_default():
+    pool, responses = rerank_stream(0, [str(i) for i in range(10)])
+    assert pool.chunk_sizes == [4, 4, 2]
+    assert responses[-1].final
+    assert sum(len(r.results) for r in responses[:-1]) == 10
+
+
+def test_bidi_stream_zero_chunk_size_uses_default():
+    pool, responses = rerank_bidi_stream(0, ["a", "b", "c"], ["d", "e", "f"])
+    assert pool.chunk_sizes == [4, 2]
+    assert sum(len(r.results) for r in responses[:-1]) == 6
+
+
+def test_chunk_size_is_clamped_to_maximum():
+    pool, _ = rerank_stream(100, [str(i) for i in range(20)])
+    assert pool.chunk_sizes == [8, 8, 4]
+
+    pool, _ = rerank_bidi_stream(100, [str(i) for i in range(20)])
+    assert pool.chunk_sizes == [8, 8, 4]